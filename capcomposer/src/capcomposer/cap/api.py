@@ -0,0 +1,265 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from django.utils.translation import gettext as _
+from wagtail.api.v2.utils import get_full_url
+from wagtail.models import Site
+
+from .cache import wagcache, get_site_cache_key
+from .http import conditional_response, parse_since
+from .pagination import KeysetPage, decode_cursor
+from .utils import get_all_published_alerts
+
+ALERTS_API_PAGE_SIZE = 20
+ALERTS_API_MAX_PAGE_SIZE = 100
+
+ALERT_CHANGES_PAGE_SIZE = 500
+ALERT_CHANGES_MAX_PAGE_SIZE = 1000
+
+# API responses are dropped when an alert of the site is published or expires
+ALERTS_API_CACHE_TIMEOUT = 60 * 60 * 4
+ALERTS_API_MAX_AGE = 60
+
+
+class AlertsAPIError(ValueError):
+    pass
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def _get_page_size(params, default, maximum):
+    try:
+        page_size = int(params.get("limit", default))
+    except ValueError:
+        raise AlertsAPIError(_("Invalid 'limit' value"))
+    return max(1, min(page_size, maximum))
+
+
+def clean_alerts_api_params(params):
+    """
+    Validated alerts API filters, page size, cursor and fields of the query `params`, without the
+    unknown parameters. Raises AlertsAPIError for invalid values.
+    """
+    cleaned = {"limit": _get_page_size(params, ALERTS_API_PAGE_SIZE, ALERTS_API_MAX_PAGE_SIZE)}
+
+    if params.get("cursor"):
+        if decode_cursor(params.get("cursor")) is None:
+            raise AlertsAPIError(_("Invalid 'cursor' value"))
+        cleaned["cursor"] = params.get("cursor")
+
+    fields = _split(params.get("fields"))
+    if fields:
+        cleaned["fields"] = sorted(set(fields))
+
+    status = params.get("status")
+    if status:
+        if status not in ("active", "expired"):
+            raise AlertsAPIError(_("Invalid 'status' value. Use 'active' or 'expired'"))
+        cleaned["status"] = status
+
+    for param in ("severity", "event"):
+        values = _split(params.get(param))
+        if values:
+            cleaned[param] = sorted(set(values))
+
+    for param in ("since", "until"):
+        if params.get(param):
+            value = parse_since(params.get(param))
+            if value is None:
+                raise AlertsAPIError(_("Invalid '%(param)s' value. Use an ISO 8601 date or datetime") % {
+                    "param": param})
+            cleaned[param] = value
+
+    bbox = _split(params.get("bbox"))
+    if bbox:
+        try:
+            west, south, east, north = [float(value) for value in bbox]
+        except ValueError:
+            raise AlertsAPIError(_("Invalid 'bbox' value. Use west,south,east,north"))
+        cleaned["bbox"] = [west, south, east, north]
+
+    return cleaned
+
+
+def _encode_params(cleaned):
+    """Query string of cleaned alerts API parameters, the same for all requests with the same parameters"""
+    encoded = {}
+    for key, value in sorted(cleaned.items()):
+        if isinstance(value, list):
+            value = ",".join(str(item) for item in value)
+        elif hasattr(value, "isoformat"):
+            value = value.isoformat()
+        encoded[key] = str(value)
+    return urlencode(encoded)
+
+
+def filter_alerts(queryset, cleaned):
+    """Apply the alerts API filters of `cleaned`, from `clean_alerts_api_params`, to `queryset`"""
+    now = timezone.now()
+
+    status = cleaned.get("status")
+    if status == "active":
+        queryset = queryset.filter(expires__gte=now)
+    elif status == "expired":
+        queryset = queryset.filter(expires__lt=now)
+
+    if cleaned.get("severity"):
+        queryset = queryset.filter(severity__in=cleaned["severity"])
+
+    if cleaned.get("event"):
+        queryset = queryset.filter(event__in=cleaned["event"])
+
+    if cleaned.get("since"):
+        queryset = queryset.filter(sent__gte=cleaned["since"])
+    if cleaned.get("until"):
+        queryset = queryset.filter(sent__lte=cleaned["until"])
+
+    if cleaned.get("bbox"):
+        west, south, east, north = cleaned["bbox"]
+        # alerts whose bounding box overlaps the requested one
+        queryset = queryset.filter(min_lon__lte=east, max_lon__gte=west, min_lat__lte=north, max_lat__gte=south)
+
+    return queryset
+
+
+def _serialize_alerts(alerts, request, fields):
+    from .serializers import AlertSerializer
+
+    # a single serializer for the whole page, so that the event infos are only loaded once
+    data = AlertSerializer(alerts, many=True, context={"request": request}).data
+
+    results = []
+    for alert, alert_data in zip(alerts, data):
+        alert_data = dict(alert_data)
+        alert_data.update({
+            "url": get_full_url(request, alert.url),
+            "xml_url": get_full_url(request, reverse("cap_alert_xml", args=[alert.guid])),
+            "thread_id": alert.thread_root_id or alert.pk,
+        })
+
+        if fields:
+            alert_data = {key: value for key, value in alert_data.items() if key in fields}
+
+        results.append(alert_data)
+
+    return results
+
+
+def _get_alerts_api_data(request, site, cleaned):
+    cursor = decode_cursor(cleaned["cursor"]) if cleaned.get("cursor") else None
+
+    queryset = get_all_published_alerts().descendant_of(site.root_page, inclusive=True)
+    queryset = filter_alerts(queryset, cleaned)
+
+    page = KeysetPage(queryset, cleaned["limit"], before=cursor)
+
+    next_url = None
+    if page.next_cursor:
+        next_query = _encode_params({**cleaned, "cursor": page.next_cursor})
+        next_url = get_full_url(request, f"{request.path}?{next_query}")
+
+    return {
+        "next": next_url,
+        "results": _serialize_alerts(page.object_list, request, set(cleaned.get("fields", []))),
+    }
+
+
+def cap_alerts_api(request):
+    """
+    Published alerts of the site as JSON, newest first.
+
+    Query parameters:
+    - cursor: the 'next' cursor of a previous page
+    - limit: page size, up to ALERTS_API_MAX_PAGE_SIZE
+    - fields: comma separated fields to return, out of the CAP alert fields and url, xml_url and thread_id
+    - status: active or expired
+    - severity, event: comma separated values
+    - bbox: west,south,east,north
+    - since, until: ISO 8601 dates or datetimes, on the sent time
+    """
+    site = Site.find_for_request(request)
+    if not site:
+        return JsonResponse({"error": "Site not found"}, status=404)
+
+    try:
+        cleaned = clean_alerts_api_params(request.GET)
+    except AlertsAPIError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # keyed on the validated parameters only, so that unknown parameters do not add cache entries
+    query = _encode_params(cleaned)
+    cache_key = get_site_cache_key(site, "alerts_api", hashlib.sha256(query.encode()).hexdigest())
+    response_data = wagcache.get(cache_key)
+
+    if response_data is None:
+        data = _get_alerts_api_data(request, site, cleaned)
+
+        content = json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
+        response_data = {
+            "content": content,
+            "etag": hashlib.sha256(content).hexdigest(),
+        }
+        wagcache.set(cache_key, response_data, ALERTS_API_CACHE_TIMEOUT)
+
+    return conditional_response(request, response_data["content"], "application/json",
+                                etag=response_data["etag"],
+                                cache_control={"public": True, "max_age": ALERTS_API_MAX_AGE})
+
+
+def _serialize_alert_change(change, request):
+    data = {
+        "seq": change.seq,
+        "action": change.action,
+        "identifier": change.identifier,
+        "guid": str(change.guid),
+        "sent": change.sent,
+        "expires": change.expires,
+    }
+
+    # the alert XML, for mirrors to fetch the new version of the alert
+    if change.action in ("published", "updated", "cancelled"):
+        data["xml_url"] = get_full_url(request, reverse("cap_alert_xml", args=[change.guid]))
+
+    return data
+
+
+def cap_alert_changes(request):
+    """
+    Changes to the published alerts of the site after the `since` sequence number, oldest first.
+
+    Mirrors keep the returned `last_seq`, and pass it as `since` on their next request. `has_more`
+    is true when more changes can be fetched right away. Without `since`, the log is read from its
+    start, which lists the alerts that were published when it was created.
+    """
+    from .models import CapAlertChange
+
+    site = Site.find_for_request(request)
+    if not site:
+        return JsonResponse({"error": "Site not found"}, status=404)
+
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        return JsonResponse({"error": _("Invalid 'since' value")}, status=400)
+
+    try:
+        limit = _get_page_size(request.GET, ALERT_CHANGES_PAGE_SIZE, ALERT_CHANGES_MAX_PAGE_SIZE)
+    except AlertsAPIError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    changes = list(CapAlertChange.objects.filter(site=site, seq__gt=since).order_by("seq")[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return JsonResponse({
+        "last_seq": changes[-1].seq if changes else since,
+        "has_more": has_more,
+        "changes": [_serialize_alert_change(change, request) for change in changes],
+    })
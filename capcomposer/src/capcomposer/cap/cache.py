@@ -1,5 +1,196 @@
-from django.core.cache import caches
+import re
+from urllib.parse import urlsplit, unquote
 
+from django.core.cache import caches
+from django.urls import reverse, NoReverseMatch
+from loguru import logger
+from wagtailcache.cache import clear_cache
 from wagtailcache.settings import wagtailcache_settings
 
 wagcache = caches[wagtailcache_settings.WAGTAIL_CACHE_BACKEND]
+
+# Public, non-page endpoints whose responses depend on the alerts of a site
+SITE_ALERT_URL_NAMES = [
+    "home_map_alerts",
+    "latest_active_alert",
+    "cap_alert_feed",
+    "cap_alerts_geojson",
+    "cap_alert_facets",
+]
+
+
+def _get_cache_version(key):
+    version = wagcache.get(key)
+
+    if version is None:
+        version = 1
+        wagcache.set(key, version, None)
+
+    return version
+
+
+def _bump_cache_version(key):
+    try:
+        return wagcache.incr(key)
+    except ValueError:
+        # key does not exist yet
+        wagcache.set(key, 2, None)
+        return 2
+
+
+def get_site_cache_version(site):
+    """
+    Current cache version of a site.
+
+    Site-scoped cache entries include this version in their key. Bumping it, on publishing or
+    updating any alert of the site, makes all of them unreachable at once, without touching
+    other sites' entries.
+    """
+    return _get_cache_version(f"cap_site_cache_version_{site.pk}")
+
+
+def bump_site_cache_version(site):
+    return _bump_cache_version(f"cap_site_cache_version_{site.pk}")
+
+
+def get_site_cache_key(site, name, *parts):
+    version = get_site_cache_version(site)
+    key = f"cap_{name}_{site.pk}_v{version}"
+
+    if parts:
+        key = "_".join([key, *[str(part) for part in parts]])
+
+    return key
+
+
+def get_alerts_cache_version():
+    """
+    Cache version of the entries listing the alerts of all sites, like the active alert widget
+    and the feed of sites whose root is not an alert list, bumped when any alert changes.
+    """
+    return _get_cache_version("cap_alerts_cache_version")
+
+
+def bump_alerts_cache_version():
+    return _bump_cache_version("cap_alerts_cache_version")
+
+
+def get_active_alert_widget_cache_key(site):
+    """
+    Key of the rendered active alert widgets of a site, for all slots and languages, in a single entry.
+
+    The key is versioned, so that a render that started before an alert was published can not
+    write its stale widgets back where the next renders read them.
+    """
+    return get_site_cache_key(
+        site,
+        "active_alert_widget",
+        f"a{get_alerts_cache_version()}",
+        f"w{_get_cache_version(f'cap_active_alert_widget_version_{site.pk}')}",
+    )
+
+
+def clear_active_alert_widget_cache(site_ids=None):
+    """
+    Drop the cached active alert widgets.
+
+    The widget lists the active alerts of all sites, so publishing any alert invalidates it
+    everywhere, unless `site_ids` is given (e.g. after a site's settings change).
+    """
+    if site_ids is None:
+        bump_alerts_cache_version()
+        return
+
+    for site_id in site_ids:
+        _bump_cache_version(f"cap_active_alert_widget_version_{site_id}")
+
+
+def get_site_settings_version(site):
+    """
+    Version of a site's CAP settings, bumped when they are saved.
+
+    Used for entries that only depend on the settings, like the XSL stylesheets, so that they
+    are not dropped every time an alert is published.
+    """
+    return _get_cache_version(f"cap_site_settings_version_{site.pk}")
+
+
+def bump_site_settings_version(site):
+    return _bump_cache_version(f"cap_site_settings_version_{site.pk}")
+
+
+def _url_regex(site, path):
+    """
+    Regex matching `path` on `site`, as stored in the wagtail-cache keyring.
+
+    Keyring entries are absolute URIs built from the request, so the scheme and port may not
+    match the site root url (e.g. behind a TLS terminating proxy). Query strings are matched too,
+    to cover paginated list pages.
+    """
+    hostname = urlsplit(site.root_url).hostname or site.hostname
+    return rf"^https?://{re.escape(hostname)}(:\d+)?{re.escape(unquote(path))}(\?.*)?$"
+
+
+def _page_path(page):
+    url_parts = page.get_url_parts()
+    return url_parts[2] if url_parts else None
+
+
+def get_alert_cache_urls(alert, site=None):
+    """
+    URL patterns of the cached responses that depend on `alert`: its detail page, the list page
+    it belongs to, the site home page, and the site-wide alert endpoints (home map, widget,
+    feed and geojson).
+    """
+    site = site or alert.get_site()
+    if not site:
+        return []
+
+    paths = [_page_path(alert)]
+
+    parent = alert.get_parent()
+    if parent:
+        paths.append(_page_path(parent))
+
+    paths.append("/")
+
+    for url_name in SITE_ALERT_URL_NAMES:
+        try:
+            paths.append(reverse(url_name))
+        except NoReverseMatch:
+            pass
+
+    return [_url_regex(site, path) for path in paths if path]
+
+
+def clear_alert_cache(*alerts):
+    """
+    Purge only the cached responses that depend on the given alerts, instead of clearing
+    the whole page cache for every site.
+    """
+    url_patterns = set()
+    sites = {}
+
+    for alert in alerts:
+        site = alert.get_site()
+        if not site:
+            continue
+
+        sites[site.pk] = site
+
+        try:
+            url_patterns.update(get_alert_cache_urls(alert, site=site))
+        except Exception as e:
+            logger.warning(f"[CAP] Could not compute cache urls for alert {alert.pk}: {e}")
+
+    for site in sites.values():
+        bump_site_cache_version(site)
+
+    if sites:
+        # drops the active alert widgets, and the feeds of sites listing the alerts of all sites
+        bump_alerts_cache_version()
+
+    # without a keyring, wagtail-cache clears the whole cache backend, which is also the celery broker
+    # and holds the cache versions. No keyring means no cached pages to purge either
+    if url_patterns and "keyring" in wagcache:
+        clear_cache(urls=sorted(url_patterns))
@@ -0,0 +1,247 @@
+import asyncio
+import io
+import json
+import logging
+from urllib.parse import parse_qs
+
+import redis.asyncio as aioredis
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from redis.exceptions import RedisError
+from wagtail.models import Site
+
+from .events import ALERT_EVENTS_CHANNEL, get_alert_events_stream_key, parse_event_id
+
+# delay before reconnecting to Redis after the pub/sub connection is lost, in seconds
+REDIS_RECONNECT_DELAY = 5
+
+logger = logging.getLogger(__name__)
+
+
+def get_stream_heartbeat():
+    return getattr(settings, "CAP_ALERT_STREAM_HEARTBEAT", 15)
+
+
+def get_stream_queue_size():
+    return getattr(settings, "CAP_ALERT_STREAM_QUEUE_SIZE", 100)
+
+
+class AlertEventBroker:
+    """
+    Fans out the alert events published on Redis to the stream clients of this process.
+
+    The process holds a single pub/sub connection, whatever its number of clients, and only while
+    it has clients. Each client gets a bounded queue. A client too slow to keep up with its queue
+    is disconnected, and resumes from the site's replay stream with Last-Event-ID on reconnect.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.listener = None
+        self.client = None
+
+    def get_client(self):
+        if self.client is None:
+            self.client = aioredis.Redis.from_url(settings.REDIS_URL)
+        return self.client
+
+    def subscribe(self, site_id):
+        queue = asyncio.Queue(maxsize=get_stream_queue_size())
+        self.subscribers.setdefault(site_id, set()).add(queue)
+
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+        return queue
+
+    def unsubscribe(self, site_id, queue):
+        queues = self.subscribers.get(site_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[site_id]
+
+    @staticmethod
+    def close(queue):
+        # drop the pending events, the client gets them again from the replay stream
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def close_all(self):
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self.close(queue)
+
+    def dispatch(self, message):
+        for queue in list(self.subscribers.get(message["site_id"], ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.close(queue)
+
+    async def listen(self):
+        while self.subscribers:
+            try:
+                async with self.get_client().pubsub() as pubsub:
+                    await pubsub.subscribe(ALERT_EVENTS_CHANNEL)
+                    while self.subscribers:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                           timeout=get_stream_heartbeat())
+                        if message:
+                            self.dispatch(json.loads(message["data"]))
+            except (RedisError, OSError) as e:
+                logger.warning(f"Alert events subscription lost: {e}")
+                # events may have been missed meanwhile. Have the clients reconnect and resume
+                self.close_all()
+                await asyncio.sleep(REDIS_RECONNECT_DELAY)
+
+
+broker = AlertEventBroker()
+
+
+@database_sync_to_async
+def get_site_for_scope(scope):
+    request = ASGIRequest(scope, io.BytesIO())
+    return Site.find_for_request(request)
+
+
+def get_last_event_id(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"last-event-id":
+            return value.decode("latin-1").strip()
+
+    # EventSource can not set headers on the first connection, so the id can also be passed in the query
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return (query.get("last_event_id") or [""])[0]
+
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+class AlertEventStream:
+    """
+    Server-Sent Events stream of the alerts published, updated, cancelled, unpublished and expired
+    on the site.
+
+    Clients resume after a disconnection with the Last-Event-ID header, from the recent events kept
+    in the site's replay stream. When the events after that id are no longer kept, a 'reset' event
+    is sent first, for the client to reload the alerts it shows. A comment line is sent when no
+    event was sent for CAP_ALERT_STREAM_HEARTBEAT seconds, to keep proxies from closing idle
+    connections.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            await self.send_error(send, 405, b"Method not allowed")
+            return
+
+        site = await get_site_for_scope(scope)
+        if not site:
+            await self.send_error(send, 404, b"Site not found")
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                # disable response buffering by nginx
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        disconnected = asyncio.create_task(wait_for_disconnect(receive))
+        # subscribe before replaying, so that no event is missed in between
+        queue = broker.subscribe(site.pk)
+
+        try:
+            await self.stream(site, queue, get_last_event_id(scope), send, disconnected)
+            if not disconnected.done():
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            broker.unsubscribe(site.pk, queue)
+            disconnected.cancel()
+
+    @staticmethod
+    async def send_error(send, status, message):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+        })
+        await send({"type": "http.response.body", "body": message})
+
+    @staticmethod
+    async def send_body(send, body):
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    async def replay(self, site, last_event_id, send):
+        """Send the events of the site after `last_event_id`. Returns the id of the last event sent"""
+        client = broker.get_client()
+        stream_key = get_alert_events_stream_key(site.pk)
+
+        first = await client.xrange(stream_key, count=1)
+        if not first or parse_event_id(first[0][0].decode()) > last_event_id:
+            # the events after the client's last one are no longer kept
+            await self.send_body(send, format_event("", "reset", "{}"))
+
+        last_sent = last_event_id
+        for entry_id, fields in await client.xrange(stream_key, min=f"({'-'.join(map(str, last_event_id))}"):
+            await self.send_body(send, format_event(entry_id.decode(), fields[b"event"].decode(),
+                                                    fields[b"data"].decode()))
+            last_sent = parse_event_id(entry_id.decode())
+
+        return last_sent
+
+    async def stream(self, site, queue, last_event_id, send, disconnected):
+        heartbeat = get_stream_heartbeat()
+
+        await self.send_body(send, f"retry: {heartbeat * 1000}\n\n".encode())
+
+        last_sent = parse_event_id(last_event_id)
+        if last_sent:
+            try:
+                last_sent = await self.replay(site, last_sent, send)
+            except RedisError as e:
+                logger.warning(f"Could not replay the alert events of site {site.pk}: {e}")
+                return
+
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=heartbeat,
+                                         return_when=asyncio.FIRST_COMPLETED)
+
+            if getter not in done:
+                getter.cancel()
+                if disconnected in done:
+                    return
+                await self.send_body(send, b": heartbeat\n\n")
+                continue
+
+            message = getter.result()
+            if message is None:
+                # closed by the broker, the client reconnects and resumes
+                return
+
+            event_id = parse_event_id(message["id"])
+            if last_sent and event_id <= last_sent:
+                # already sent while replaying
+                continue
+
+            await self.send_body(send, format_event(message["id"], message["event"], message["data"]))
+            last_sent = event_id
@@ -0,0 +1,103 @@
+import json
+import logging
+import re
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+# pub/sub channel the alert events of all sites are published on, for the stream clients to be notified
+ALERT_EVENTS_CHANNEL = "cap:alert_events"
+
+MSG_TYPE_EVENTS = {
+    "Alert": "published",
+    "Update": "updated",
+    "Cancel": "cancelled",
+}
+
+EVENT_ID_RE = re.compile(r"^\d+-\d+$")
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def get_alert_events_stream_key(site_id):
+    """Redis stream keeping the recent alert events of a site, for clients to resume from"""
+    return f"cap:alert_events:{site_id}"
+
+
+def get_alert_events_replay_length():
+    return getattr(settings, "CAP_ALERT_STREAM_REPLAY_LENGTH", 1000)
+
+
+def parse_event_id(event_id):
+    """Comparable form of a Redis stream entry id like '1712345678901-0', or None if invalid"""
+    if not event_id or not EVENT_ID_RE.match(event_id):
+        return None
+    ms, seq = event_id.split("-")
+    return int(ms), int(seq)
+
+
+def get_alert_event_data(alert, event):
+    site = alert.cap_site
+    root_url = site.root_url if site else ""
+
+    return {
+        "type": event,
+        "identifier": alert.identifier,
+        "guid": str(alert.guid),
+        "msgType": alert.msgType,
+        "sent": alert.sent,
+        "expires": alert.expires,
+        "severity": alert.severity,
+        "event": alert.event,
+        "thread_id": alert.thread_root_id or alert.pk,
+        "url": alert.full_url,
+        "xml_url": f"{root_url}{reverse('cap_alert_xml', args=[alert.guid])}",
+    }
+
+
+def publish_alert_event(alert, event=None):
+    """
+    Notify the stream clients of the alert's site of a change to the alert.
+
+    The event is one of published, updated, cancelled, unpublished or expired. By default, it is
+    derived from the alert msgType. Events are appended to the site's replay stream, then published
+    on ALERT_EVENTS_CHANNEL with their stream id. Returns the event id, or None if Redis is not
+    available.
+    """
+    site = alert.cap_site
+    if not site:
+        return None
+
+    event = event or MSG_TYPE_EVENTS.get(alert.msgType, "published")
+    data = json.dumps(get_alert_event_data(alert, event), cls=DjangoJSONEncoder)
+
+    try:
+        client = get_redis_client()
+        event_id = client.xadd(
+            get_alert_events_stream_key(site.pk),
+            {"event": event, "data": data},
+            maxlen=get_alert_events_replay_length(),
+            approximate=True,
+        ).decode()
+        client.publish(ALERT_EVENTS_CHANNEL, json.dumps({
+            "site_id": site.pk,
+            "id": event_id,
+            "event": event,
+            "data": data,
+        }))
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish the '{event}' event of alert {alert.pk}: {e}")
+        return None
+
+    return event_id
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import wagcache, clear_alert_cache
+
+# how long the markers deduplicating the boundary tasks are kept after the boundary
+BOUNDARY_MARKER_TIMEOUT = 60 * 60 * 24 * 2
+
+# how far back the sweep looks for expired alerts whose expiry was not processed
+EXPIRY_SWEEP_LOOKBACK = timedelta(days=1)
+
+
+def get_expiry_sweep_interval():
+    return getattr(settings, "CAP_ALERT_EXPIRY_SWEEP_INTERVAL", 5)
+
+
+def get_boundary_schedule_window():
+    """
+    How far ahead boundary tasks are enqueued.
+
+    The Redis broker redelivers the tasks that are not acknowledged within its visibility timeout,
+    which includes the ETA tasks waiting on workers. Only boundaries well within it are enqueued,
+    later ones are enqueued by the sweep as they come closer.
+    """
+    transport_options = getattr(settings, "CELERY_BROKER_TRANSPORT_OPTIONS", None) or {}
+    return timedelta(seconds=transport_options.get("visibility_timeout", 60 * 60) / 2)
+
+
+def get_alert_boundaries(alert):
+    """Times at which the status of an alert changes: the effective and expires times of its infos, sorted"""
+    times = {alert.expires} if alert.expires else set()
+
+    for info in alert.info:
+        for key in ("effective", "expires"):
+            value = info.value.get(key)
+            if value:
+                times.add(value)
+
+    return sorted(times)
+
+
+def _boundary_marker_key(alert_id, boundary, name):
+    return f"cap_alert_boundary_{name}_{alert_id}_{int(boundary.timestamp())}"
+
+
+def schedule_alert_boundary(alert, after=None):
+    """
+    Enqueue a task running at the next status change of a published alert, after `after` or now.
+
+    Scheduling the same boundary again, like when an alert is republished, is a no-op. Boundaries
+    beyond the schedule window are left to the sweep. Returns the boundary, or None if the alert
+    has no status change left.
+    """
+    from .tasks import handle_alert_boundary
+
+    after = after or timezone.now()
+    boundary = next((time for time in get_alert_boundaries(alert) if time > after), None)
+    if boundary is None:
+        return None
+
+    if boundary > timezone.now() + get_boundary_schedule_window():
+        return boundary
+
+    timeout = int((boundary - after).total_seconds()) + BOUNDARY_MARKER_TIMEOUT
+    if wagcache.add(_boundary_marker_key(alert.pk, boundary, "scheduled"), True, timeout):
+        handle_alert_boundary.apply_async(args=[alert.pk, boundary.isoformat()], eta=boundary)
+
+    return boundary
+
+
+def process_alert_boundary(alert, boundary):
+    """
+    Refresh what depends on the status of a published alert, once `boundary` is reached.
+
+    Drops the cached pages, feeds, geojson and widgets of the alert's site, logs its expiry, and
+    schedules its next status change. Each boundary is processed once, whether from its scheduled
+    task or the expiry sweep.
+    """
+    from .models import CapAlertChange, notify_alert_change
+
+    first_run = wagcache.add(_boundary_marker_key(alert.pk, boundary, "processed"), True, BOUNDARY_MARKER_TIMEOUT)
+
+    now = timezone.now()
+    expired = (
+            alert.expires is not None
+            and alert.expires <= now
+            and not CapAlertChange.objects.filter(alert=alert, action="expired").exists()
+    )
+
+    if not first_run and not expired:
+        return
+
+    clear_alert_cache(alert)
+
+    if expired:
+        notify_alert_change(alert, "expired")
+
+    if first_run:
+        schedule_alert_boundary(alert, after=now)
+
+
+def get_boundary_alerts():
+    """Published alerts whose status changes are tracked"""
+    from .models import CapAlertPage
+
+    return CapAlertPage.objects.live().filter(status="Actual", scope="Public")
+
+
+def sweep_expired_alerts():
+    """
+    Process the expiry of the alerts that expired recently without it being processed, like when
+    their scheduled task was lost, or alerts published before the scheduler existed.
+
+    Also enqueues the boundaries of the alerts expiring later, once they are within the schedule window.
+    """
+    from .models import CapAlertChange
+
+    now = timezone.now()
+
+    for alert in get_boundary_alerts().filter(expires__gt=now):
+        schedule_alert_boundary(alert, after=now)
+    expired_logged = CapAlertChange.objects.filter(action="expired").values("alert_id")
+
+    alerts = get_boundary_alerts().filter(
+        expires__lte=now,
+        expires__gte=now - EXPIRY_SWEEP_LOOKBACK,
+    ).exclude(id__in=expired_logged)
+
+    for alert in alerts:
+        process_alert_boundary(alert, alert.expires)
@@ -0,0 +1,165 @@
+import logging
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .cache import wagcache
+from .utils import serialize_and_sign_cap_alert
+
+logger = logging.getLogger(__name__)
+
+# alerts read from the database, and written to the archive, at a time
+EXPORT_CHUNK_SIZE = 100
+
+# alerts serialized by a pool worker per task
+EXPORT_BATCH_SIZE = 10
+
+# zip entries can not be dated earlier than 1980
+ZIP_MIN_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def get_export_workers():
+    return getattr(settings, "CAP_XML_EXPORT_WORKERS", 4)
+
+
+class _ChunkWriter:
+    """Write-only file object collecting the zip output, for it to be streamed chunk by chunk"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def get_alert_xml_filename(alert):
+    identifier = re.sub(r"[^\w.-]", "_", alert.identifier or str(alert.guid))
+    if alert.sent:
+        return f"{alert.sent:%Y/%m}/{identifier}.xml"
+    return f"{identifier}.xml"
+
+
+def _iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _serialize_alerts(alerts, request):
+    xml_by_id = {}
+    for alert in alerts:
+        try:
+            xml_by_id[alert.pk], _ = serialize_and_sign_cap_alert(alert, request)
+        except Exception as e:
+            logger.error(f"Could not serialize alert {alert.pk} for export: {e}")
+    return xml_by_id
+
+
+def _serialize_alerts_in_worker(alerts, request):
+    try:
+        return _serialize_alerts(alerts, request)
+    finally:
+        # pool threads each open their own database connection
+        connection.close()
+
+
+def _get_chunk_xml(alerts, request, executor):
+    """XML of a chunk of alerts, from the signed XML cached by the XML view if any, serialized otherwise"""
+    cache_keys = {f"cap_alert_xml_{alert.guid}": alert for alert in alerts}
+    cached = wagcache.get_many(list(cache_keys.keys()))
+
+    xml_by_id = {cache_keys[key].pk: xml.encode("utf-8") for key, xml in cached.items()}
+    missing = [alert for alert in alerts if alert.pk not in xml_by_id]
+
+    if executor is None:
+        xml_by_id.update(_serialize_alerts(missing, request))
+    else:
+        batches = [missing[i:i + EXPORT_BATCH_SIZE] for i in range(0, len(missing), EXPORT_BATCH_SIZE)]
+        for batch_xml in executor.map(lambda batch: _serialize_alerts_in_worker(batch, request), batches):
+            xml_by_id.update(batch_xml)
+
+    return xml_by_id
+
+
+def stream_cap_xml_zip(queryset, request=None):
+    """
+    Yield a ZIP archive of the CAP XML of the alerts in `queryset`, chunk by chunk.
+
+    Alerts are read and written EXPORT_CHUNK_SIZE at a time, so memory use does not depend on the
+    number of alerts. Alerts that fail to serialize are listed in an errors.txt entry.
+    """
+    workers = get_export_workers()
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    writer = _ChunkWriter()
+    failed = []
+
+    try:
+        with zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            alerts = queryset.order_by("sent", "id").iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+            for chunk in _iter_chunks(alerts, EXPORT_CHUNK_SIZE):
+                xml_by_id = _get_chunk_xml(chunk, request, executor)
+
+                for alert in chunk:
+                    xml = xml_by_id.get(alert.pk)
+                    if xml is None:
+                        failed.append(alert.identifier or str(alert.guid))
+                        continue
+
+                    date_time = alert.sent.timetuple()[:6] if alert.sent else ZIP_MIN_DATE_TIME
+                    info = zipfile.ZipInfo(get_alert_xml_filename(alert), date_time=max(date_time, ZIP_MIN_DATE_TIME))
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(info, xml)
+
+                yield writer.pop()
+
+            if failed:
+                archive.writestr("errors.txt", "\n".join(failed))
+
+        yield writer.pop()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def astream_cap_xml_zip(queryset, request=None):
+    """
+    Async variant of `stream_cap_xml_zip`, for ASGI servers.
+
+    Under ASGI, Django reads sync streaming responses whole in a thread before sending them, which
+    would build the archive in memory. Here each chunk is built in the sync thread, and sent
+    before the next one is built.
+    """
+    chunks = stream_cap_xml_zip(queryset, request)
+    # the same thread for all chunks, as the alerts are read from a server-side cursor
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
+    finally:
+        # closes the cursor and the serialization pool when the client disconnects
+        await sync_to_async(chunks.close, thread_sensitive=True)()
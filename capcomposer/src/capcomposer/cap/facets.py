@@ -0,0 +1,119 @@
+from django.db.models import Count, Q, Min
+from django.utils import timezone
+from django.utils.translation import gettext
+
+from capcomposer.capeditor.constants import SEVERITY_MAPPING
+from .cache import wagcache, get_site_cache_key
+from .utils import get_all_published_alerts
+
+# upper bound for how long facet counts are cached, when no active alert expires sooner
+FACETS_CACHE_TIMEOUT = 60 * 60 * 4
+
+
+def _get_facet_counts(queryset):
+    now = timezone.now()
+
+    by_severity = {
+        row["severity"]: row["count"]
+        for row in queryset.order_by().values("severity").annotate(count=Count("id"))
+        if row["severity"]
+    }
+
+    by_event = {
+        row["event"]: row["count"]
+        for row in queryset.order_by().values("event").annotate(count=Count("id"))
+        if row["event"]
+    }
+
+    by_status = queryset.order_by().aggregate(
+        active=Count("id", filter=Q(expires__gte=now)),
+        expired=Count("id", filter=Q(expires__lt=now)),
+        next_expiry=Min("expires", filter=Q(expires__gte=now)),
+    )
+
+    return {
+        "severity": by_severity,
+        "event": by_event,
+        "status": {
+            "active": by_status["active"],
+            "expired": by_status["expired"],
+        },
+        "next_expiry": by_status["next_expiry"],
+    }
+
+
+def get_alert_facet_counts(site, list_page=None):
+    """
+    Severity, event and status counts over all the published alerts of a site, or of one of its
+    list pages.
+
+    Counts come from the indexed severity and event columns, and are cached until an alert of the
+    site is published, or the next active alert expires.
+    """
+    cache_key = get_site_cache_key(site, "alert_facets", list_page.pk if list_page else "site")
+    counts = wagcache.get(cache_key)
+
+    if counts is None:
+        queryset = get_all_published_alerts()
+
+        if list_page:
+            queryset = queryset.child_of(list_page)
+        else:
+            queryset = queryset.descendant_of(site.root_page, inclusive=True)
+
+        counts = _get_facet_counts(queryset)
+
+        timeout = FACETS_CACHE_TIMEOUT
+        next_expiry = counts.pop("next_expiry")
+        if next_expiry:
+            seconds_to_expiry = int((next_expiry - timezone.now()).total_seconds()) + 1
+            timeout = max(1, min(timeout, seconds_to_expiry))
+
+        wagcache.set(cache_key, counts, timeout)
+
+    return counts
+
+
+def get_alert_facets(site, list_page=None):
+    """
+    Facet counts with display labels.
+
+    Counts are over all the published alerts, not only the ones of a list page's current page,
+    and alerts are counted by the severity and event of their first info. The `value` of each
+    facet is the one the list page filters the alerts on, so that the counts match the results.
+    """
+    counts = get_alert_facet_counts(site, list_page=list_page)
+
+    severity_facets = {}
+    for severity, count in sorted(counts["severity"].items(),
+                                  key=lambda x: SEVERITY_MAPPING.get(x[0], {}).get("id", 0), reverse=True):
+        severity_mapping = SEVERITY_MAPPING.get(severity)
+        if not severity_mapping:
+            continue
+
+        severity_facets[str(severity_mapping.get("severity"))] = {
+            "value": severity,
+            "count": count,
+            "label": str(severity_mapping.get("label")),
+        }
+
+    event_facets = {}
+    for event, count in sorted(counts["event"].items(), key=lambda x: x[1], reverse=True):
+        event_translated = gettext(event)
+        # by event rather than label, as events may share a translation
+        event_facets[event] = {
+            "value": event,
+            "count": count,
+            "label": event_translated,
+        }
+
+    status_facets = {
+        "active": {"count": counts["status"]["active"], "label": gettext("Active Alerts")},
+        "expired": {"count": counts["status"]["expired"], "label": gettext("Past Alerts")},
+    }
+
+    return {
+        "severity": severity_facets,
+        "event_types": event_facets,
+        "status": status_facets,
+    }
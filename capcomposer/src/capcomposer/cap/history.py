@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .cache import wagcache, get_site_cache_key
+from .utils import get_all_published_alerts
+
+# upper bound for how long an alert window is cached, when no active alert expires sooner
+ALERT_WINDOW_CACHE_TIMEOUT = 60 * 60 * 4
+
+SUMMARY_FIELDS = ("id", "title", "slug", "url_path", "path", "depth", "locale", "content_type", "sent", "expires",
+                  "severity", "event")
+
+
+def get_alert_history_window_size():
+    return getattr(settings, "CAP_ALERT_HISTORY_WINDOW", 20)
+
+
+class AlertWindowPages:
+    """Pages of the alerts of a window, loaded in a single query on first access"""
+
+    def __init__(self, alert_ids):
+        self.alert_ids = alert_ids
+
+    @cached_property
+    def pages(self):
+        from .models import CapAlertPage
+        return CapAlertPage.objects.in_bulk(self.alert_ids)
+
+
+class AlertSummary:
+    """
+    Summary row of a published alert, built from its columns only.
+
+    The full per-info display data is built lazily, on first access to `infos`, so listings that
+    only need the summary never load or expand the alert's StreamFields. The pages of all the rows
+    of a window are then loaded together.
+    """
+
+    def __init__(self, row, window_pages=None):
+        self.row = row
+        self.window_pages = window_pages or AlertWindowPages([row["id"]])
+
+    def __getitem__(self, key):
+        return self.row[key]
+
+    def get(self, key, default=None):
+        return self.row.get(key, default)
+
+    @property
+    def expired(self):
+        expires = self.row.get("expires")
+        return expires is not None and expires < timezone.now()
+
+    @cached_property
+    def alert(self):
+        return self.window_pages.pages.get(self.row["id"])
+
+    @cached_property
+    def infos(self):
+        # the alert may have been deleted since the window was cached
+        return self.alert.get_infos() if self.alert else []
+
+
+def _summary_row(alert):
+    return {
+        "id": alert.pk,
+        "title": alert.title,
+        "url": alert.get_url(),
+        "sent": alert.sent,
+        "expires": alert.expires,
+        "severity": alert.severity,
+        "event": alert.event,
+    }
+
+
+def _get_alert_window_rows(queryset, past_limit):
+    now = timezone.now()
+    queryset = queryset.only(*SUMMARY_FIELDS)
+
+    active = list(queryset.filter(expires__gte=now).order_by("-sent", "-id"))
+    past = list(queryset.filter(expires__lt=now).order_by("-sent", "-id")[:past_limit])
+
+    next_expiry = min((alert.expires for alert in active), default=None)
+
+    return {
+        "active": [_summary_row(alert) for alert in active],
+        "past": [_summary_row(alert) for alert in past],
+    }, next_expiry
+
+
+def get_alert_history_window(site, past_limit=None, root_page=None):
+    """
+    The active alerts of a site, plus its `past_limit` most recent past alerts, newest first.
+
+    The cost depends on the window size and not on the size of the alert archive. Rows are cached
+    until an alert of the site is published, or the next active alert expires.
+    """
+    if past_limit is None:
+        past_limit = get_alert_history_window_size()
+
+    root_page = root_page or site.root_page
+
+    cache_key = get_site_cache_key(site, "alert_window", root_page.pk, past_limit)
+    rows = wagcache.get(cache_key)
+
+    if rows is None:
+        queryset = get_all_published_alerts().descendant_of(root_page, inclusive=True)
+        rows, next_expiry = _get_alert_window_rows(queryset, past_limit)
+
+        timeout = ALERT_WINDOW_CACHE_TIMEOUT
+        if next_expiry:
+            seconds_to_expiry = int((next_expiry - timezone.now()).total_seconds()) + 1
+            timeout = max(1, min(timeout, seconds_to_expiry))
+
+        wagcache.set(cache_key, rows, timeout)
+
+    window_pages = AlertWindowPages([row["id"] for row in rows["active"] + rows["past"]])
+
+    return {
+        "active_alerts": [AlertSummary(row, window_pages) for row in rows["active"]],
+        "past_alerts": [AlertSummary(row, window_pages) for row in rows["past"]],
+    }
@@ -0,0 +1,48 @@
+from datetime import datetime, time
+
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils.http import http_date, quote_etag
+
+
+def parse_since(value):
+    """Parse a 'since' query parameter, as an ISO 8601 date or datetime. Returns None if invalid"""
+    try:
+        since = parse_datetime(value)
+        if since is None:
+            since_date = parse_date(value)
+            if since_date is None:
+                return None
+            since = datetime.combine(since_date, time.min)
+    except ValueError:
+        return None
+    
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    
+    return since
+
+
+def conditional_response(request, content, content_type, etag=None, last_modified=None, cache_control=None):
+    """
+    Response for `content` with validators, answering conditional requests that still match
+    with 304 Not Modified instead of sending the content again.
+    """
+    if etag:
+        etag = quote_etag(etag)
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    
+    return response
@@ -1,27 +1,174 @@
-from django.core.management.base import BaseCommand
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.db.models import Q
+from django.utils import timezone
 
+from capcomposer.cap.cache import clear_alert_cache
 from capcomposer.cap.models import CapAlertPage
 from capcomposer.cap.utils import create_cap_alert_multi_media
 
+DEFAULT_CHECKPOINT_FILE = os.path.join(tempfile.gettempdir(), "cap_alerts_multi_media.checkpoint.json")
+
+
+def _process_cap_alert(cap_alert_id):
+    """Generate multimedia content for a single alert.
+
+    Runs either in-process or inside a pool worker, so it only takes and returns plain values.
+    Cache invalidation is deliberately left to the caller, once the whole batch is done.
+    """
+    try:
+        create_cap_alert_multi_media(cap_alert_id, clear_cache_on_success=False)
+        return cap_alert_id, None
+    except Exception as e:
+        return cap_alert_id, str(e)
+
 
 class Command(BaseCommand):
     help = "Create CAP alert Multi Media content for CAP Alerts without Multi Media content generated."
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of worker processes to use. Defaults to 1 (process in the foreground)")
+        parser.add_argument("--since", type=str, default=None,
+                            help="Only process alerts sent on or after this date (YYYY-MM-DD or ISO 8601 datetime)")
+        parser.add_argument("--checkpoint-file", type=str, default=DEFAULT_CHECKPOINT_FILE,
+                            help="File used to record processed alerts, so that an interrupted run can be resumed")
+        parser.add_argument("--resume", action="store_true",
+                            help="Skip alerts already recorded in the checkpoint file by a previous run")
+
     def handle(self, *args, **options):
+        workers = options["workers"]
+        checkpoint_file = options["checkpoint_file"]
+
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+
         # Get all CAP Alerts without Multi Media content
         cap_alerts = CapAlertPage.objects.all().live().filter(
             Q(alert_area_map_image__isnull=True) | Q(alert_pdf_preview__isnull=True), status="Actual", )
-        
-        if not cap_alerts.exists():
+
+        if options["since"]:
+            cap_alerts = cap_alerts.filter(sent__gte=self.parse_since(options["since"]))
+
+        checkpoint = {"completed": [], "failed": []}
+        if options["resume"]:
+            checkpoint = self.load_checkpoint(checkpoint_file)
+        elif os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
+        # alerts that failed are retried, so only the completed ones are skipped
+        skip_ids = set(checkpoint["completed"])
+        checkpoint["failed"] = []
+
+        cap_alert_ids = [
+            alert_id for alert_id in cap_alerts.order_by("-sent").values_list("id", flat=True)
+            if alert_id not in skip_ids
+        ]
+
+        if not cap_alert_ids:
             print("No CAP Alerts without Multi Media content found. Exiting...")
             return
-        
-        count = cap_alerts.count()
-        
-        print(f"Processing {count} CAP Alerts")
-        
-        for i, cap_alert in enumerate(cap_alerts):
-            print(f"[{i + 1}/{count}] Processing CAP Alert: {cap_alert.title}")
-            create_cap_alert_multi_media(cap_alert.id, clear_cache_on_success=True)
-            print(f"[{i + 1}/{count}] Completed processing CAP Alert: {cap_alert.title}")
+
+        count = len(cap_alert_ids)
+
+        if skip_ids:
+            print(f"Resuming from checkpoint. Skipping {len(skip_ids)} previously processed CAP Alerts")
+
+        print(f"Processing {count} CAP Alerts with {workers} worker(s)")
+
+        processed = 0
+        try:
+            for cap_alert_id, error in self.run(cap_alert_ids, workers):
+                processed += 1
+
+                if error:
+                    checkpoint["failed"].append(cap_alert_id)
+                    self.stderr.write(f"\nFailed to process CAP Alert {cap_alert_id}: {error}")
+                else:
+                    checkpoint["completed"].append(cap_alert_id)
+
+                self.save_checkpoint(checkpoint_file, checkpoint)
+                self.print_progress(processed, count, len(checkpoint["failed"]))
+        finally:
+            sys.stdout.write("\n")
+
+            # invalidate the cached pages of the processed alerts once for the whole batch, rather than once per alert
+            if checkpoint["completed"]:
+                clear_alert_cache(*CapAlertPage.objects.filter(id__in=checkpoint["completed"]))
+
+        print(f"Completed processing {count} CAP Alerts. {len(checkpoint['failed'])} failed.")
+
+        if not checkpoint["failed"] and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
+    @staticmethod
+    def run(cap_alert_ids, workers):
+        if workers == 1:
+            for cap_alert_id in cap_alert_ids:
+                yield _process_cap_alert(cap_alert_id)
+            return
+
+        # close connections before forking, so that each worker opens its own instead of sharing the parent's sockets
+        connections.close_all()
+
+        mp_context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            futures = [executor.submit(_process_cap_alert, cap_alert_id) for cap_alert_id in cap_alert_ids]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    @staticmethod
+    def parse_since(value):
+        try:
+            since = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid --since value '{value}'. Use YYYY-MM-DD or an ISO 8601 datetime")
+
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        return since
+
+    @staticmethod
+    def load_checkpoint(checkpoint_file):
+        if not os.path.exists(checkpoint_file):
+            return {"completed": [], "failed": []}
+
+        try:
+            with open(checkpoint_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read checkpoint file '{checkpoint_file}': {e}")
+
+        return {
+            "completed": data.get("completed", []),
+            "failed": data.get("failed", []),
+        }
+
+    @staticmethod
+    def save_checkpoint(checkpoint_file, checkpoint):
+        # write to a temp file first so that an interruption never leaves a truncated checkpoint behind
+        tmp_file = f"{checkpoint_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_file, checkpoint_file)
+
+    @staticmethod
+    def print_progress(processed, total, failed, width=40):
+        filled = int(width * processed / total)
+        bar = "#" * filled + "-" * (width - filled)
+        sys.stdout.write(f"\r[{bar}] {processed}/{total} ({failed} failed)")
+        sys.stdout.flush()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from capcomposer.cap.models import CapAlertPage
+
+
+class Command(BaseCommand):
+    help = "Compute the stored bounding box of CAP Alerts, used to filter alerts by location in the alerts API."
+    
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Recompute the bounding box of all alerts, not only of those without one")
+    
+    def handle(self, *args, **options):
+        cap_alerts = CapAlertPage.objects.all()
+        
+        if not options["all"]:
+            cap_alerts = cap_alerts.filter(min_lon__isnull=True)
+        
+        count = 0
+        for cap_alert in cap_alerts.iterator():
+            cap_alert.update_bounds()
+            
+            if cap_alert.min_lon is None:
+                continue
+            
+            CapAlertPage.objects.filter(pk=cap_alert.pk).update(
+                min_lon=cap_alert.min_lon,
+                min_lat=cap_alert.min_lat,
+                max_lon=cap_alert.max_lon,
+                max_lat=cap_alert.max_lat,
+            )
+            count += 1
+        
+        print(f"Updated the bounding box of {count} CAP Alerts")
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+def populate_severity_and_event(apps, schema_editor):
+    CapAlertPage = apps.get_model('cap', 'CapAlertPage')
+    
+    for alert in CapAlertPage.objects.all().only("id", "info").iterator():
+        alert_infos = [info for info in alert.info.raw_data if info.get("type") == "alert_info"]
+        if not alert_infos:
+            continue
+        
+        info_value = alert_infos[0].get("value") or {}
+        CapAlertPage.objects.filter(pk=alert.pk).update(
+            severity=info_value.get("severity"),
+            event=info_value.get("event"),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cap', '0037_alter_othercapsettings_active_alert_style'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capalertpage',
+            name='severity',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='capalertpage',
+            name='event',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(populate_severity_and_event, migrations.RunPython.noop),
+    ]
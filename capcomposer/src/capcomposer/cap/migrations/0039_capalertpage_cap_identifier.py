@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def format_date_to_oid(oid_prefix, date):
+    # copied from capeditor.utils as of this migration
+    return f"urn:oid:{oid_prefix}.{date.year}.{date.month}.{date.day}.{date.hour}.{date.minute}.{date.second}"
+
+
+def populate_cap_identifier(apps, schema_editor):
+    CapAlertPage = apps.get_model('cap', 'CapAlertPage')
+    CapSetting = apps.get_model('capeditor', 'CapSetting')
+    Site = apps.get_model('wagtailcore', 'Site')
+    
+    # deepest site roots first, so that alerts are matched to their closest site
+    for site in Site.objects.select_related("root_page").order_by("-root_page__depth"):
+        cap_setting = CapSetting.objects.filter(site=site).first()
+        wmo_oid = cap_setting.wmo_oid if cap_setting else None
+        
+        alerts = CapAlertPage.objects.filter(live=True, cap_identifier__isnull=True,
+                                             path__startswith=site.root_page.path)
+        
+        for alert in alerts.only("id", "guid", "sent").iterator():
+            if wmo_oid:
+                identifier = format_date_to_oid(wmo_oid, alert.sent)
+            else:
+                identifier = str(alert.guid)
+            
+            CapAlertPage.objects.filter(pk=alert.pk).update(cap_identifier=identifier)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cap', '0038_capalertpage_severity_event'),
+        ('capeditor', '0020_alter_alertlanguage_setting_and_more'),
+        ('wagtailcore', '0094_alter_page_locale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capalertpage',
+            name='cap_identifier',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, verbose_name='Identifier'),
+        ),
+        migrations.RunPython(populate_cap_identifier, migrations.RunPython.noop),
+    ]
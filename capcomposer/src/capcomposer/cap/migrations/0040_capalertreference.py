@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_alert_references(apps, schema_editor):
+    CapAlertPage = apps.get_model('cap', 'CapAlertPage')
+    CapAlertReference = apps.get_model('cap', 'CapAlertReference')
+    
+    alert_ids = set(CapAlertPage.objects.values_list("id", flat=True))
+    references = []
+    
+    for alert in CapAlertPage.objects.exclude(msgType="Alert").only("id", "msgType", "references").iterator():
+        reference_ids = []
+        
+        for reference in (alert.references.raw_data if alert.references else []):
+            ref_alert_id = (reference.get("value") or {}).get("ref_alert")
+            if ref_alert_id in alert_ids and ref_alert_id != alert.pk and ref_alert_id not in reference_ids:
+                reference_ids.append(ref_alert_id)
+        
+        for index, ref_alert_id in enumerate(reference_ids):
+            references.append(CapAlertReference(alert_id=alert.pk, ref_alert_id=ref_alert_id, kind=alert.msgType,
+                                                sort_order=index))
+    
+    CapAlertReference.objects.bulk_create(references, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cap', '0039_capalertpage_cap_identifier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapAlertReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=100)),
+                ('sort_order', models.PositiveIntegerField(default=0)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reference_links', to='cap.capalertpage')),
+                ('ref_alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referenced_by_links', to='cap.capalertpage')),
+            ],
+            options={
+                'ordering': ['sort_order'],
+                'indexes': [models.Index(fields=['kind', 'ref_alert'], name='cap_alertref_kind_ref_idx')],
+                'unique_together': {('alert', 'ref_alert')},
+            },
+        ),
+        migrations.RunPython(populate_alert_references, migrations.RunPython.noop),
+    ]
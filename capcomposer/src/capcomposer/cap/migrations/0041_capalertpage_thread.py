@@ -0,0 +1,63 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_alert_threads(apps, schema_editor):
+    CapAlertPage = apps.get_model('cap', 'CapAlertPage')
+    CapAlertReference = apps.get_model('cap', 'CapAlertReference')
+    
+    ref_ids_by_alert = {}
+    for alert_id, ref_alert_id in CapAlertReference.objects.values_list("alert_id", "ref_alert_id"):
+        ref_ids_by_alert.setdefault(alert_id, []).append(ref_alert_id)
+    
+    # alerts are processed oldest first, so that referenced alerts are placed before the alerts referencing them.
+    # Threads joined by a later alert are merged into the oldest one
+    roots = {}
+    positions = {}
+    
+    def find_root(alert_id):
+        while roots[alert_id] != alert_id:
+            alert_id = roots[alert_id]
+        return alert_id
+    
+    alert_ids = list(CapAlertPage.objects.filter(live=True).order_by("sent", "id").values_list("id", flat=True))
+    sent_order = {alert_id: index for index, alert_id in enumerate(alert_ids)}
+    
+    for alert_id in alert_ids:
+        ref_ids = [ref_id for ref_id in ref_ids_by_alert.get(alert_id, []) if ref_id in positions]
+        
+        if ref_ids:
+            ref_root_ids = {find_root(ref_id) for ref_id in ref_ids}
+            root_id = min(ref_root_ids, key=lambda ref_root_id: sent_order[ref_root_id])
+            for ref_root_id in ref_root_ids:
+                roots[ref_root_id] = root_id
+            roots[alert_id] = root_id
+            positions[alert_id] = max(positions[ref_id] for ref_id in ref_ids) + 1
+        else:
+            roots[alert_id] = alert_id
+            positions[alert_id] = 0
+    
+    for alert_id in alert_ids:
+        CapAlertPage.objects.filter(pk=alert_id).update(thread_root_id=find_root(alert_id),
+                                                        thread_position=positions[alert_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cap', '0040_capalertreference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capalertpage',
+            name='thread_root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cap.capalertpage'),
+        ),
+        migrations.AddField(
+            model_name='capalertpage',
+            name='thread_position',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_alert_threads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import F
+
+# copied from cap.search as of this migration, so that later changes to the search do not change it
+SEARCH_CONFIGS = {
+    "ar": "arabic",
+    "da": "danish",
+    "de": "german",
+    "el": "greek",
+    "en": "english",
+    "es": "spanish",
+    "fi": "finnish",
+    "fr": "french",
+    "hu": "hungarian",
+    "id": "indonesian",
+    "it": "italian",
+    "lt": "lithuanian",
+    "ne": "nepali",
+    "nl": "dutch",
+    "no": "norwegian",
+    "pt": "portuguese",
+    "ro": "romanian",
+    "ru": "russian",
+    "sv": "swedish",
+    "ta": "tamil",
+    "tr": "turkish",
+}
+
+
+def get_info_search_data(info_raw):
+    value = info_raw.get("value") or {}
+    language = value.get("language") or ""
+    
+    area_desc = [
+        (area.get("value") or {}).get("areaDesc") for area in (value.get("area") or [])
+    ]
+    
+    return {
+        "info_id": info_raw.get("id") or "",
+        "language": language,
+        "config": SEARCH_CONFIGS.get(language.lower().split("-")[0], "simple") if language else "simple",
+        "event": value.get("event") or "",
+        "headline": value.get("headline") or "",
+        "description": value.get("description") or "",
+        "instruction": value.get("instruction") or "",
+        "area_desc": ", ".join(filter(None, area_desc)),
+    }
+
+
+def populate_search_entries(apps, schema_editor):
+    CapAlertPage = apps.get_model('cap', 'CapAlertPage')
+    CapAlertSearchEntry = apps.get_model('cap', 'CapAlertSearchEntry')
+    
+    entries = []
+    for alert in CapAlertPage.objects.only("id", "info").iterator():
+        for info in (alert.info.raw_data if alert.info else []):
+            entries.append(CapAlertSearchEntry(alert_id=alert.pk, **get_info_search_data(info)))
+    
+    CapAlertSearchEntry.objects.bulk_create(entries, batch_size=500)
+    
+    config = F("config")
+    CapAlertSearchEntry.objects.update(search_vector=(
+            SearchVector("headline", "event", weight="A", config=config)
+            + SearchVector("area_desc", weight="B", config=config)
+            + SearchVector("description", weight="C", config=config)
+            + SearchVector("instruction", weight="D", config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cap', '0041_capalertpage_thread'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapAlertSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('info_id', models.CharField(blank=True, max_length=255)),
+                ('language', models.CharField(blank=True, max_length=50)),
+                ('config', models.CharField(default='simple', max_length=50)),
+                ('event', models.TextField(blank=True)),
+                ('headline', models.TextField(blank=True)),
+                ('description', models.TextField(blank=True)),
+                ('instruction', models.TextField(blank=True)),
+                ('area_desc', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='cap.capalertpage')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='cap_alert_search_vector_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search_entries, migrations.RunPython.noop),
+    ]
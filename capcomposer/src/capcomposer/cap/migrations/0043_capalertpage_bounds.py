@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cap', '0042_capalertsearchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capalertpage',
+            name='min_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='capalertpage',
+            name='min_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='capalertpage',
+            name='max_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='capalertpage',
+            name='max_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='capalertpage',
+            index=models.Index(fields=['min_lon', 'max_lon', 'min_lat', 'max_lat'], name='cap_alert_bounds_idx'),
+        ),
+    ]
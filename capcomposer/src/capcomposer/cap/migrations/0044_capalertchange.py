@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_alert_changes(apps, schema_editor):
+    """Log the currently published public alerts, so that mirrors can start from the log"""
+    CapAlertPage = apps.get_model('cap', 'CapAlertPage')
+    CapAlertChange = apps.get_model('cap', 'CapAlertChange')
+    Site = apps.get_model('wagtailcore', 'Site')
+    
+    msg_type_actions = {"Alert": "published", "Update": "updated", "Cancel": "cancelled"}
+    
+    # deepest site root first, to match each alert to the closest site above it
+    site_paths = sorted(
+        ((site.root_page.path, site.pk) for site in Site.objects.select_related("root_page")),
+        key=lambda site_path: len(site_path[0]),
+        reverse=True,
+    )
+    
+    changes = []
+    alerts = CapAlertPage.objects.filter(live=True, status="Actual", scope="Public").order_by("sent", "id")
+    for alert in alerts.iterator():
+        site_id = next((pk for path, pk in site_paths if alert.path.startswith(path)), None)
+        if site_id is None:
+            continue
+        
+        changes.append(CapAlertChange(
+            site_id=site_id,
+            alert_id=alert.pk,
+            action=msg_type_actions.get(alert.msgType, "published"),
+            guid=alert.guid,
+            identifier=alert.cap_identifier or str(alert.guid),
+            sent=alert.sent,
+            expires=alert.expires,
+        ))
+    
+    CapAlertChange.objects.bulk_create(changes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0096_referenceindex_referenceindex_source_object_and_more'),
+        ('cap', '0043_capalertpage_bounds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapAlertChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('published', 'Published'), ('updated', 'Updated'), ('cancelled', 'Cancelled'), ('expired', 'Expired'), ('unpublished', 'Unpublished')], max_length=20)),
+                ('guid', models.UUIDField()),
+                ('identifier', models.CharField(blank=True, max_length=255)),
+                ('sent', models.DateTimeField(null=True)),
+                ('expires', models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('alert', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='changes', to='cap.capalertpage')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.site')),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['site', 'seq'], name='cap_alertchange_site_seq_idx')],
+            },
+        ),
+        migrations.RunPython(populate_alert_changes, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,18 @@
+import hashlib
 import logging
 
 from django.conf import settings
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.signals import post_save
 from django.template.defaultfilters import truncatechars
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
-from django.utils.translation import gettext_lazy as _, gettext
+from django.utils.http import urlencode
+from django.utils.translation import gettext_lazy as _
 from wagtail import blocks
 from wagtail.admin.panels import FieldPanel
 from wagtail.api.v2.utils import get_full_url
@@ -16,22 +20,34 @@ from wagtail.contrib.settings.models import BaseSiteSetting
 from wagtail.contrib.settings.registry import register_setting
 from wagtail.documents import get_document_model
 from wagtail.images import get_image_model
-from wagtail.models import Page, PreviewableMixin
-from wagtail.signals import page_published
+from wagtail.models import Page, PreviewableMixin, Site
+from wagtail.signals import page_published, page_unpublished
 from wagtail_newsletter.models import NewsletterPageMixin
 
 from capcomposer.capeditor.cap_settings import CapSetting
 from capcomposer.capeditor.models import AbstractCapAlertPage, CapAlertPageForm
+from capcomposer.capeditor.utils import get_event_info_map
+from .cache import clear_alert_cache, clear_active_alert_widget_cache, bump_site_cache_version, \
+    bump_site_settings_version
+from .events import MSG_TYPE_EVENTS, publish_alert_event
+from .expiry import schedule_alert_boundary
+from .facets import get_alert_facets
 from .external_feed.models import ExternalAlertFeed, ExternalAlertFeedEntry
 from .mixins import MetadataPageMixin
 from .mqtt.models import CAPAlertMQTTBroker, CAPAlertMQTTBrokerEvent
+from .pagination import CachedCountPaginator, KeysetPage, decode_cursor, get_cached_count
 from .permissions import CAPMenuPermission
+from .search import get_info_search_data, get_search_vector
+from .threads import update_alert_thread
 from .utils import get_all_published_alerts
 from .webhook.models import CAPAlertWebhook, CAPAlertWebhookEvent
 
 __all__ = [
     "CapAlertListPage",
     "CapAlertPage",
+    "CapAlertReference",
+    "CapAlertSearchEntry",
+    "CapAlertChange",
     "OtherCAPSettings",
     "CAPAlertWebhook",
     "CAPAlertWebhookEvent",
@@ -44,6 +60,9 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+# id of the PostgreSQL advisory lock serializing the writes to the alert change log
+CAP_ALERT_CHANGE_LOG_LOCK_ID = 62871540
+
 CAP_MAX_LIST_PAGE_COUNT = getattr(settings, "CAP_MAX_LIST_PAGE_COUNT", None)
 CAP_LIST_PAGE_PARENT_PAGE_TYPES = getattr(settings, "CAP_LIST_PAGE_PARENT_PAGE_TYPES", None)
 
@@ -67,12 +86,49 @@ class CapAlertListPage(MetadataPageMixin, Page):
         FieldPanel("alerts_infos_per_page"),
     ]
     
+    # columns needed to render the alert list items
+    LIST_ITEM_FIELDS = ("id", "title", "slug", "url_path", "path", "depth", "locale", "content_type", "guid", "sent",
+                        "info", "cap_identifier")
+    
+    @staticmethod
+    def get_selected_filters(request):
+        """Severity and event values selected in the list filters, matched against the first info of alerts"""
+        return {
+            "severity": sorted(set(filter(None, request.GET.getlist("severity")))),
+            "event": sorted(set(filter(None, request.GET.getlist("event")))),
+        }
+    
+    def get_alerts_page(self, request, site, selected_filters=None):
+        queryset = get_all_published_alerts().child_of(self).only(*self.LIST_ITEM_FIELDS)
+        count_cache_name = f"alert_list_page_{self.pk}"
+        
+        selected_filters = selected_filters or {}
+        if selected_filters.get("severity"):
+            queryset = queryset.filter(severity__in=selected_filters["severity"])
+        if selected_filters.get("event"):
+            queryset = queryset.filter(event__in=selected_filters["event"])
+        
+        filter_query = urlencode(selected_filters, doseq=True)
+        if filter_query:
+            count_cache_name = f"{count_cache_name}_{hashlib.md5(filter_query.encode()).hexdigest()}"
+        
+        # legacy page-number links keep working, with the count cached instead of computed on each request
+        if "page" in request.GET:
+            paginator = CachedCountPaginator(queryset, self.alerts_infos_per_page, site, count_cache_name)
+            return paginator.get_page(request.GET.get("page")), "page"
+        
+        before = decode_cursor(request.GET.get("before"))
+        after = decode_cursor(request.GET.get("after")) if not before else None
+        count = get_cached_count(queryset, site, count_cache_name)
+        
+        page_obj = KeysetPage(queryset, self.alerts_infos_per_page, before=before, after=after, count=count)
+        
+        return page_obj, "keyset"
+    
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
         cap_rss_feed_url = get_full_url(request, reverse("cap_alert_feed"))
         
-        current_page = request.GET.get("page", 1)
-        
         site = self.get_site()
         
         context.update({
@@ -82,25 +138,21 @@ class CapAlertListPage(MetadataPageMixin, Page):
         other_cap_settings = OtherCAPSettings.for_site(site)
         default_alert_display_language = other_cap_settings.default_alert_display_language
         
-        queryset = get_all_published_alerts().child_of(self)
-        
-        paginator = Paginator(queryset, self.alerts_infos_per_page)
+        selected_filters = self.get_selected_filters(request)
+        page_obj, pagination_mode = self.get_alerts_page(request, site, selected_filters)
         
-        try:
-            page_obj = paginator.page(current_page)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
+        # resolve the site settings and event infos once for all the alerts on the page
+        cap_setting = CapSetting.for_site(site)
+        event_infos = get_event_info_map(cap_setting)
         
         alert_infos = []
         
         for alert in page_obj.object_list:
-            infos = alert.infos
+            infos = alert.get_infos(site=site, cap_setting=cap_setting, event_infos=event_infos)
             default_info = infos[0]
             
             # try to get the info in the default language
-            if default_alert_display_language and len(alert.info) > 1:
+            if default_alert_display_language and len(infos) > 1:
                 for info_item in infos:
                     info_lang = info_item.get("info").value.get("language")
                     if default_info:
@@ -112,8 +164,7 @@ class CapAlertListPage(MetadataPageMixin, Page):
             # take first alert by default
             alert_infos.append(default_info)
         
-        alert_infos = sorted(alert_infos, key=lambda x: x.get("sent", {}), reverse=True)
-        
+        # alerts are already ordered by (sent, id), newest first
         active_alerts = []
         past_alerts = []
         
@@ -130,44 +181,18 @@ class CapAlertListPage(MetadataPageMixin, Page):
         
         context.update({
             "alerts_by_expiry": alerts_by_expiry,
-            "filters": self.get_filters(alert_infos),
+            "filters": self.get_filters(site),
+            "selected_filters": selected_filters,
+            "filter_query": urlencode(selected_filters, doseq=True),
             "pagination": page_obj,
+            "pagination_mode": pagination_mode,
         })
         
         return context
     
-    @staticmethod
-    def get_filters(alerts):
-        filters = {
-            "severity": {},
-            "event_types": {}
-        }
-        
-        for alert_info in alerts:
-            severity = alert_info.get("severity")
-            severity_val = severity.get("severity")
-            
-            event_type = gettext(alert_info.get("info", {}).value.get('event'))
-            
-            if filters["event_types"].get(event_type):
-                count = filters["event_types"].get(event_type).get("count") + 1
-                filters["event_types"].get(event_type).update({"count": count})
-            else:
-                filters["event_types"].update({event_type: {
-                    "count": 1,
-                    "label": event_type
-                }})
-            
-            if filters["severity"].get(severity_val):
-                count = filters["severity"].get(severity_val).get("count") + 1
-                filters["severity"].get(severity_val).update({"count": count})
-            else:
-                filters["severity"].update({severity_val: {
-                    "count": 1,
-                    "label": severity.get("label")
-                }})
-        
-        return filters
+    def get_filters(self, site):
+        """Severity and event type filters, with counts over all the published alerts of this page, filtered or not"""
+        return get_alert_facets(site, list_page=self)
 
 
 class CapPageForm(CapAlertPageForm):
@@ -245,6 +270,10 @@ class CapPageForm(CapAlertPageForm):
         return super().save(commit=commit)
 
 
+# columns of the bounding box of the alert areas
+BOUNDS_FIELDS = ("min_lon", "min_lat", "max_lon", "max_lat")
+
+
 class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage):
     base_form_class = CapPageForm
     template = "cap/alert_detail.html"
@@ -252,6 +281,18 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
     subpage_types = []
     
     expires = models.DateTimeField(blank=True, null=True)
+    # denormalized from the first info, to filter and facet alert listings in the database
+    severity = models.CharField(max_length=50, blank=True, null=True, db_index=True, editable=False)
+    event = models.CharField(max_length=255, blank=True, null=True, db_index=True, editable=False)
+    # incident thread (Alert -> Update -> Cancel) of the alert, computed from its references on publish
+    thread_root = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="+",
+                                    editable=False)
+    thread_position = models.PositiveIntegerField(default=0, editable=False)
+    # bounding box of all the info areas, to filter alerts by location in the database
+    min_lon = models.FloatField(blank=True, null=True, editable=False)
+    min_lat = models.FloatField(blank=True, null=True, editable=False)
+    max_lon = models.FloatField(blank=True, null=True, editable=False)
+    max_lat = models.FloatField(blank=True, null=True, editable=False)
     
     alert_area_map_image = models.ForeignKey(
         get_image_model(),
@@ -278,6 +319,9 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
     class Meta:
         ordering = ["-sent"]
         verbose_name = _("CAP Alert")
+        indexes = [
+            models.Index(fields=["min_lon", "max_lon", "min_lat", "max_lat"], name="cap_alert_bounds_idx"),
+        ]
     
     @property
     def has_png_and_pdf(self):
@@ -335,27 +379,23 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
     def xml_link(self):
         return reverse("cap_alert_xml", args=(self.guid,))
     
-    @property
+    @cached_property
     def reference_alerts(self):
-        alerts = []
-        
         if self.msgType == "Alert":
-            return alerts
-        
-        for ref in self.references:
-            alert_page = ref.value.get("ref_alert")
-            if alert_page:
-                alerts.append(alert_page.specific)
+            return []
         
         # sort by date sent
-        alerts = sorted(alerts, key=lambda x: x.sent)
-        
-        return alerts
+        return sorted(self.get_reference_alerts(), key=lambda x: x.sent)
+    
+    def get_referencing_alerts(self):
+        """Alerts referencing this alert, like its updates and cancellations, oldest first"""
+        return CapAlertPage.objects.filter(reference_links__ref_alert=self).order_by("sent")
     
     def get_geojson_features(self, request=None):
         features = []
+        infos = self.get_infos(request=request) if request else self.infos
         
-        for info_item in self.infos:
+        for info_item in infos:
             info = info_item.get("info")
             if info.value.geojson:
                 web = info_item.get("url")
@@ -364,6 +404,7 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
                 
                 properties = {
                     "id": self.identifier,
+                    "thread_id": self.thread_root_id or self.pk,
                     "event": info_item.get("event"),
                     "headline": info.value.get("headline"),
                     "severity": info.value.get("severity"),
@@ -387,9 +428,21 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
         features = sorted(features, key=lambda x: x.get("order"))
         return features
     
-    def get_cap_setting_context(self):
-        site = self.get_site()
-        cap_setting = CapSetting.for_site(site)
+    def update_bounds(self):
+        # the areas may have changed since the bounds were last computed on this instance
+        self.__dict__.pop("feature_collection", None)
+        self.__dict__.pop("bounds", None)
+        
+        try:
+            bounds = self.bounds
+        except Exception as e:
+            logger.warning(f"Could not compute bounds for alert {self.pk}: {e}")
+            bounds = None
+        
+        self.min_lon, self.min_lat, self.max_lon, self.max_lat = bounds if bounds else (None, None, None, None)
+    
+    def get_cap_setting_context(self, request=None):
+        cap_setting = self.get_cap_setting(request=request)
         
         return {
             "org_logo": cap_setting.logo,
@@ -421,7 +474,7 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
             "sorted_infos": infos,
         })
         
-        cap_setting_context = self.get_cap_setting_context()
+        cap_setting_context = self.get_cap_setting_context(request=request)
         
         context.update(cap_setting_context)
         
@@ -462,8 +515,161 @@ class CapAlertPage(MetadataPageMixin, NewsletterPageMixin, AbstractCapAlertPage)
                 # use current time. Replace seconds and microseconds to 0
                 sent = timezone.now().replace(second=0, microsecond=0)
                 self.sent = sent
+                # derived from `sent`, so it is computed again below
+                self.cap_identifier = None
+        
+        # persist <identifier> once the alert is live, instead of deriving it from the site settings on every access
+        if self.live and not self.cap_identifier and self.cap_site:
+            self.cap_identifier = self.get_identifier()
+
+        if self.info:
+            info = self.info[0]
+            self.severity = info.value.get("severity")
+            self.event = info.value.get("event")
+
+        # drafts and media are saved with update_fields, which do not store the bounds
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or set(update_fields) & {"info", *BOUNDS_FIELDS}:
+            self.update_bounds()
+
+        result = super().save(*args, **kwargs)
+
+        # drafts are saved with update_fields, and do not change the stored references
+        if update_fields is None or "references" in update_fields or "msgType" in update_fields:
+            CapAlertReference.sync_for_alert(self)
+        if update_fields is None or "info" in update_fields:
+            CapAlertSearchEntry.sync_for_alert(self)
+
+        return result
 
-        return super().save(*args, **kwargs)
+
+class CapAlertReference(models.Model):
+    """
+    References of an alert to earlier alerts, mirrored from its references StreamField on save.
+
+    Lets reference lookups, like finding the alerts cancelled by published Cancel alerts, or the
+    updates of an alert, run as a single joined query.
+    """
+    alert = models.ForeignKey(CapAlertPage, on_delete=models.CASCADE, related_name="reference_links")
+    ref_alert = models.ForeignKey(CapAlertPage, on_delete=models.CASCADE, related_name="referenced_by_links")
+    # message type of the referencing alert, e.g. Update or Cancel
+    kind = models.CharField(max_length=100)
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["sort_order"]
+        unique_together = ("alert", "ref_alert")
+        indexes = [
+            models.Index(fields=["kind", "ref_alert"], name="cap_alertref_kind_ref_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.alert_id} -> {self.ref_alert_id} ({self.kind})"
+
+    @classmethod
+    def sync_for_alert(cls, alert):
+        reference_ids = [ref_id for ref_id in alert.get_reference_ids() if ref_id != alert.pk]
+
+        # only references to existing alerts
+        if reference_ids:
+            existing_ids = set(CapAlertPage.objects.filter(id__in=reference_ids).values_list("id", flat=True))
+            reference_ids = [ref_id for ref_id in reference_ids if ref_id in existing_ids]
+
+        cls.objects.filter(alert=alert).delete()
+        cls.objects.bulk_create([
+            cls(alert=alert, ref_alert_id=ref_id, kind=alert.msgType, sort_order=index)
+            for index, ref_id in enumerate(reference_ids)
+        ])
+
+
+class CapAlertSearchEntry(models.Model):
+    """
+    Full text search entry of an alert info, stemmed with the text search configuration of the
+    info language. Rebuilt from the alert's info StreamField on save.
+    """
+    alert = models.ForeignKey(CapAlertPage, on_delete=models.CASCADE, related_name="search_entries")
+    info_id = models.CharField(max_length=255, blank=True)
+    language = models.CharField(max_length=50, blank=True)
+    config = models.CharField(max_length=50, default="simple")
+    event = models.TextField(blank=True)
+    headline = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    instruction = models.TextField(blank=True)
+    area_desc = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="cap_alert_search_vector_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.alert_id} ({self.language})"
+
+    @classmethod
+    def sync_for_alert(cls, alert):
+        infos = alert.info.raw_data if alert.info else []
+
+        cls.objects.filter(alert=alert).delete()
+        cls.objects.bulk_create([cls(alert=alert, **get_info_search_data(info)) for info in infos])
+
+        # computed in the database, to stem each entry with the configuration of its language
+        cls.objects.filter(alert=alert).update(search_vector=get_search_vector())
+
+
+class CapAlertChange(models.Model):
+    """
+    Append-only log of the changes to the published alerts of a site, for mirrors to sync from.
+
+    Writers hold a transaction level lock, so that entries commit in `seq` order, and a mirror that
+    read the log up to a `seq` never misses an entry committed later with a lower one.
+    """
+    ACTION_CHOICES = [
+        ("published", _("Published")),
+        ("updated", _("Updated")),
+        ("cancelled", _("Cancelled")),
+        ("expired", _("Expired")),
+        ("unpublished", _("Unpublished")),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name="+")
+    alert = models.ForeignKey(CapAlertPage, on_delete=models.SET_NULL, null=True, related_name="changes")
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    guid = models.UUIDField()
+    identifier = models.CharField(max_length=255, blank=True)
+    sent = models.DateTimeField(null=True)
+    expires = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["seq"]
+        indexes = [
+            models.Index(fields=["site", "seq"], name="cap_alertchange_site_seq_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.identifier} {self.action}"
+
+    @classmethod
+    def record(cls, alert, action=None):
+        site = alert.cap_site
+        if not site:
+            return None
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CAP_ALERT_CHANGE_LOG_LOCK_ID])
+
+            return cls.objects.create(
+                site=site,
+                alert=alert,
+                action=action or MSG_TYPE_EVENTS.get(alert.msgType, "published"),
+                guid=alert.guid,
+                identifier=alert.identifier,
+                sent=alert.sent,
+                expires=alert.expires,
+            )
 
 
 @register_setting(name="other-cap-settings")
@@ -489,6 +695,19 @@ class OtherCAPSettings(BaseSiteSetting):
         verbose_name_plural = _("Other Settings")
 
 
+def notify_alert_change(alert, action=None):
+    """
+    Log a change to a public alert and notify the alert stream clients, once the current transaction
+    commits. The action defaults to the one of the alert msgType.
+    """
+
+    def notify():
+        CapAlertChange.record(alert, action)
+        publish_alert_event(alert, action)
+
+    transaction.on_commit(notify)
+
+
 def on_publish_cap_alert(sender, **kwargs):
     from .tasks import (
         handle_publish_alert_to_mqtt,
@@ -499,7 +718,15 @@ def on_publish_cap_alert(sender, **kwargs):
     
     alert = kwargs['instance']
     
+    update_alert_thread(alert)
+    
     if alert.status == "Actual" and alert.scope == "Public":
+        # purge the cached pages listing this alert
+        clear_alert_cache(alert)
+        # log the change for mirrors, and push it to the alert stream clients
+        notify_alert_change(alert)
+        # refresh the caches and feeds when the alert becomes effective and expires
+        transaction.on_commit(lambda: schedule_alert_boundary(alert))
         # publish to mqtt
         handle_publish_alert_to_mqtt.delay(alert.id)
         # publish to webhook
@@ -512,4 +739,27 @@ def on_publish_cap_alert(sender, **kwargs):
         handle_send_private_alert_email.delay(alert.id)
 
 
+def on_unpublish_cap_alert(sender, **kwargs):
+    alert = kwargs['instance']
+    
+    if alert.status == "Actual" and alert.scope == "Public":
+        # purge the cached pages and widgets still showing this alert
+        clear_alert_cache(alert)
+        notify_alert_change(alert, "unpublished")
+
+
+def on_save_other_cap_settings(sender, instance, **kwargs):
+    # the active alert widget depends on the style and display language settings
+    clear_active_alert_widget_cache(site_ids=[instance.site_id])
+
+
+def on_save_cap_setting(sender, instance, **kwargs):
+    # cached responses of the site, like the feed and stylesheets, include its sender details and logo
+    bump_site_cache_version(instance.site)
+    bump_site_settings_version(instance.site)
+
+
 page_published.connect(on_publish_cap_alert, sender=CapAlertPage)
+page_unpublished.connect(on_unpublish_cap_alert, sender=CapAlertPage)
+post_save.connect(on_save_other_cap_settings, sender=OtherCAPSettings)
+post_save.connect(on_save_cap_setting, sender=CapSetting)
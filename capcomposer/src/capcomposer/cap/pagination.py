@@ -0,0 +1,124 @@
+import base64
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import wagcache, get_site_cache_key
+
+
+def encode_cursor(alert):
+    value = f"{alert.sent.isoformat()}|{alert.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a (sent, id) cursor. Returns None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode()).decode()
+        sent, pk = value.rsplit("|", 1)
+        return datetime.fromisoformat(sent), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def get_cached_count(queryset, site, name):
+    """
+    Count of `queryset`, cached until alerts of `site` change.
+
+    Counting published alerts means a full scan of the cancel-excluding query, while the count only
+    changes when an alert of the site is published.
+    """
+    cache_key = get_site_cache_key(site, name, "count")
+    count = wagcache.get(cache_key)
+
+    if count is None:
+        count = queryset.count()
+        wagcache.set(cache_key, count)
+
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, object_list, per_page, site, count_cache_name, **kwargs):
+        self.site = site
+        self.count_cache_name = count_cache_name
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        return get_cached_count(self.object_list, self.site, self.count_cache_name)
+
+
+class KeysetPage:
+    """
+    A page of alerts ordered by (sent, id), newest first.
+
+    Each page is fetched with a single indexed range query, whatever its position in the listing,
+    instead of an OFFSET over all the previous pages.
+    """
+
+    def __init__(self, queryset, per_page, before=None, after=None, count=None):
+        self.per_page = per_page
+        self.count = count
+
+        if after:
+            sent, pk = after
+            items = list(
+                queryset.filter(Q(sent__gt=sent) | Q(sent=sent, id__gt=pk)).order_by("sent", "id")[:per_page + 1]
+            )
+            has_more = len(items) > per_page
+            items = list(reversed(items[:per_page]))
+            self.has_previous_page = has_more
+            self.has_next_page = True
+        else:
+            if before:
+                sent, pk = before
+                queryset = queryset.filter(Q(sent__lt=sent) | Q(sent=sent, id__lt=pk))
+            items = list(queryset.order_by("-sent", "-id")[:per_page + 1])
+            has_more = len(items) > per_page
+            items = items[:per_page]
+            self.has_previous_page = before is not None
+            self.has_next_page = has_more
+
+        self.object_list = items
+
+        # only the first page has a meaningful number. Templates use it to tell the first page apart
+        self.number = None if self.has_previous_page else 1
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if self.has_next_page and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_page and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, -(-self.count // self.per_page))
@@ -0,0 +1,113 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Case, F, FloatField, Max, OuterRef, Q, Subquery, When
+
+# PostgreSQL text search configurations for the ISO 639-1 codes of alert info languages.
+# Other languages are indexed without stemming, with the 'simple' configuration
+SEARCH_CONFIGS = {
+    "ar": "arabic",
+    "da": "danish",
+    "de": "german",
+    "el": "greek",
+    "en": "english",
+    "es": "spanish",
+    "fi": "finnish",
+    "fr": "french",
+    "hu": "hungarian",
+    "id": "indonesian",
+    "it": "italian",
+    "lt": "lithuanian",
+    "ne": "nepali",
+    "nl": "dutch",
+    "no": "norwegian",
+    "pt": "portuguese",
+    "ro": "romanian",
+    "ru": "russian",
+    "sv": "swedish",
+    "ta": "tamil",
+    "tr": "turkish",
+}
+
+DEFAULT_SEARCH_CONFIG = "simple"
+
+
+def get_search_config(language):
+    """Text search configuration for a language code like 'en' or 'en-US'"""
+    if not language:
+        return DEFAULT_SEARCH_CONFIG
+    return SEARCH_CONFIGS.get(language.lower().split("-")[0], DEFAULT_SEARCH_CONFIG)
+
+
+def get_info_search_data(info_raw):
+    """
+    Searchable text of an alert info, from its raw StreamField data.
+
+    Reads the raw data, so that it does not build the info areas geometries.
+    """
+    value = info_raw.get("value") or {}
+    language = value.get("language") or ""
+
+    area_desc = [
+        (area.get("value") or {}).get("areaDesc") for area in (value.get("area") or [])
+    ]
+
+    return {
+        "info_id": info_raw.get("id") or "",
+        "language": language,
+        "config": get_search_config(language),
+        "event": value.get("event") or "",
+        "headline": value.get("headline") or "",
+        "description": value.get("description") or "",
+        "instruction": value.get("instruction") or "",
+        "area_desc": ", ".join(filter(None, area_desc)),
+    }
+
+
+def get_search_vector():
+    """Weighted search vector of an entry, each entry stemmed with the configuration of its own language"""
+    config = F("config")
+
+    return (
+            SearchVector("headline", "event", weight="A", config=config)
+            + SearchVector("area_desc", weight="B", config=config)
+            + SearchVector("description", weight="C", config=config)
+            + SearchVector("instruction", weight="D", config=config)
+    )
+
+
+def search_alerts(queryset, query, language=None):
+    """
+    Alerts of `queryset` matching `query`, best match first.
+
+    Each info is matched in its own language. Passing a language restricts the search to infos
+    in that language.
+
+    The entries are matched with a constant query per text search configuration, so that the
+    search vector index is used, and the best rank of each alert is aggregated from the matches.
+    """
+    from .models import CapAlertSearchEntry
+
+    if language:
+        configs = [get_search_config(language)]
+    else:
+        configs = sorted(set(SEARCH_CONFIGS.values()) | {DEFAULT_SEARCH_CONFIG})
+
+    search_queries = {config: SearchQuery(query, config=config, search_type="websearch") for config in configs}
+
+    matches = Q()
+    for config, search_query in search_queries.items():
+        matches |= Q(config=config, search_vector=search_query)
+
+    entries = CapAlertSearchEntry.objects.filter(matches)
+    if language:
+        entries = entries.filter(language__istartswith=language.split("-")[0])
+
+    rank = Case(
+        *[When(config=config, then=SearchRank(F("search_vector"), search_query))
+          for config, search_query in search_queries.items()],
+        output_field=FloatField(),
+    )
+    best_ranks = entries.annotate(rank=rank).values("alert_id").annotate(best_rank=Max("rank"))
+
+    return queryset.filter(pk__in=entries.values("alert_id")).annotate(
+        search_rank=Subquery(best_ranks.filter(alert_id=OuterRef("pk")).values("best_rank")[:1])
+    ).order_by("-search_rank", "-sent")
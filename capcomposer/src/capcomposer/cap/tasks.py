@@ -1,5 +1,6 @@
 import json
 import logging
+from datetime import datetime
 
 from celery.signals import worker_ready
 from celery_singleton import Singleton, clear_locks
@@ -7,6 +8,7 @@ from django.utils.text import slugify
 from django_celery_beat.models import IntervalSchedule, PeriodicTask
 
 from capcomposer.utils import get_celery_app
+from .expiry import get_boundary_alerts, get_expiry_sweep_interval, process_alert_boundary, sweep_expired_alerts
 from .external_feed.utils import fetch_and_process_feed
 from .models import CapAlertPage, ExternalAlertFeed
 from .mqtt.publish import publish_cap_to_all_mqtt_brokers
@@ -92,6 +94,22 @@ def handle_generate_multimedia(self, alert_id):
     create_cap_alert_multi_media(alert.pk, clear_cache_on_success=True)
 
 
+@app.task(bind=True)
+def handle_alert_boundary(self, alert_id, boundary):
+    # not a singleton task, as it schedules its own next run with the same alert
+    alert = get_boundary_alerts().filter(id=alert_id).first()
+    if not alert:
+        logger.info(f"Alert {alert_id} is no longer published, skipping its status change")
+        return
+
+    process_alert_boundary(alert, datetime.fromisoformat(boundary))
+
+
+@app.task(base=Singleton, bind=True)
+def handle_expired_alerts_sweep(self):
+    sweep_expired_alerts()
+
+
 def create_or_update_alert_feed_periodic_tasks(external_feed, delete=False):
     periodic_task = None
     if external_feed.periodic_task:
@@ -149,3 +167,20 @@ def handle_send_private_alert_email(self, alert_id):
 
     send_private_alert_email(alert_id)
     
+
+
+@app.on_after_finalize.connect
+def setup_alert_expiry_sweep_task(sender, **kwargs):
+    schedule, created = IntervalSchedule.objects.get_or_create(
+        every=get_expiry_sweep_interval(),
+        period=IntervalSchedule.MINUTES,
+    )
+    
+    PeriodicTask.objects.update_or_create(
+        name="cap-expired-alerts-sweep",
+        defaults={
+            "interval": schedule,
+            "task": handle_expired_alerts_sweep.name,
+            "enabled": True,
+        }
+    )
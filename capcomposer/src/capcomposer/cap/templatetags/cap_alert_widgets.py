@@ -8,13 +8,21 @@ afterwards keeps the server language while the chrome around it is translated.
 
 Rendering the widget as part of the initial response puts it in front of the
 translator along with everything else.
+
+As the widget is rendered on every page view, the rendered HTML is cached per
+site, slot and language, until an alert is published or unpublished, or the
+shown alerts change status.
 """
 
 from django import template
+from django.db.models import Min
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+from wagtail.models import Site
 
+from ..cache import get_active_alert_widget_cache_key, wagcache
 from ..models import OtherCAPSettings
 from ..utils import get_currently_active_alerts
 
@@ -27,16 +35,20 @@ WIDGET_TEMPLATES = {
 
 DEFAULT_ALERT_STYLE = "nav_left"
 
+# upper bound for how long rendered widgets are cached, when no shown alert changes status sooner
+WIDGET_CACHE_TIMEOUT = 60 * 60 * 4
+
 
 def _get_latest_active_alert(request, cap_settings):
     """The first currently-active alert, in the configured display language."""
     default_language = cap_settings.default_alert_display_language
 
     for alert in get_currently_active_alerts():
-        alert_info = alert.infos[0]
+        infos = alert.get_infos(request=request)
+        alert_info = infos[0]
 
         if default_language and len(alert.info) > 1:
-            for info_item in alert.infos:
+            for info_item in infos:
                 info_language = info_item.get("info").value.get("language")
                 if info_language and (
                     info_language == default_language.code
@@ -51,6 +63,53 @@ def _get_latest_active_alert(request, cap_settings):
     return None
 
 
+def _get_next_status_change(latest_active_alert):
+    """
+    When the rendered widget goes stale without any alert being published: the next active
+    alert expiry, or the shown alert becoming effective.
+    """
+    now = timezone.now()
+    boundaries = []
+
+    next_expiry = get_currently_active_alerts().order_by().aggregate(next_expiry=Min("expires"))["next_expiry"]
+    if next_expiry:
+        boundaries.append(next_expiry)
+
+    if latest_active_alert:
+        effective = latest_active_alert.get("effective")
+        if effective and effective > now:
+            boundaries.append(effective)
+
+    return min(boundaries) if boundaries else None
+
+
+def _render_active_alert_widget(request, slot):
+    """Render the widget for `slot`, or an empty string if it is not the configured style"""
+    cap_settings = OtherCAPSettings.for_request(request)
+    alert_style = cap_settings.active_alert_style or DEFAULT_ALERT_STYLE
+
+    if alert_style != slot:
+        return "", None
+
+    latest_active_alert = _get_latest_active_alert(request, cap_settings)
+    next_status_change = _get_next_status_change(latest_active_alert)
+
+    if not latest_active_alert:
+        return "", next_status_change
+
+    html = render_to_string(
+        WIDGET_TEMPLATES[slot],
+        {
+            "latest_active_alert": latest_active_alert,
+            "alert_style": alert_style,
+            "request": request,
+        },
+        request=request,
+    )
+
+    return html, next_status_change
+
+
 @register.simple_tag(takes_context=True)
 def active_alert_widget(context, slot):
     """Render the active-alert widget if `slot` matches the configured style.
@@ -66,24 +125,31 @@ def active_alert_widget(context, slot):
     if request is None:
         return ""
 
-    cap_settings = OtherCAPSettings.for_request(request)
-    alert_style = cap_settings.active_alert_style or DEFAULT_ALERT_STYLE
+    site = Site.find_for_request(request)
+    if site is None:
+        html, _ = _render_active_alert_widget(request, slot)
+        return mark_safe(html)
 
-    if alert_style != slot:
-        return ""
+    fragment_key = f"{slot}_{get_language()}"
+    # read once, so that the fragments are written back under the version they were rendered for
+    cache_key = get_active_alert_widget_cache_key(site)
+    cached = wagcache.get(cache_key) or {"stale_at": None, "fragments": {}}
 
-    latest_active_alert = _get_latest_active_alert(request, cap_settings)
-    if not latest_active_alert:
-        return ""
+    html = cached["fragments"].get(fragment_key)
+    if html is not None:
+        return mark_safe(html)
 
-    return mark_safe(
-        render_to_string(
-            WIDGET_TEMPLATES[slot],
-            {
-                "latest_active_alert": latest_active_alert,
-                "alert_style": alert_style,
-                "request": request,
-            },
-            request=request,
-        )
-    )
+    html, next_status_change = _render_active_alert_widget(request, slot)
+
+    # all fragments of a site share one entry, which goes stale at the earliest status change of any of them
+    stale_at = min(filter(None, [cached["stale_at"], next_status_change]), default=None)
+    timeout = WIDGET_CACHE_TIMEOUT
+    if stale_at:
+        seconds_to_change = int((stale_at - timezone.now()).total_seconds()) + 1
+        timeout = max(1, min(timeout, seconds_to_change))
+
+    cached["fragments"][fragment_key] = html
+    cached["stale_at"] = stale_at
+    wagcache.set(cache_key, cached, timeout)
+
+    return mark_safe(html)
@@ -0,0 +1,77 @@
+from django.db.models import Q
+from django.urls import reverse
+from wagtail.api.v2.utils import get_full_url
+
+THREAD_ALERT_FIELDS = ("id", "title", "slug", "url_path", "path", "depth", "locale", "content_type", "guid", "sent",
+                       "msgType", "status", "scope", "expires", "cap_identifier", "thread_root", "thread_position")
+
+
+def update_alert_thread(alert):
+    """
+    Place a published alert in its incident thread, from the alerts it references.
+
+    An alert referencing nothing starts its own thread. Otherwise it joins the thread of the alerts
+    it references, one position after the latest of them. When the references span several
+    threads, they are merged into the oldest one.
+    """
+    from .models import CapAlertPage
+
+    refs = list(
+        CapAlertPage.objects.filter(referenced_by_links__alert=alert).only("id", "thread_root", "thread_position")
+    )
+
+    if not refs:
+        root_id = alert.pk
+        position = 0
+    else:
+        ref_root_ids = {ref.thread_root_id or ref.pk for ref in refs}
+        root_id = CapAlertPage.objects.filter(id__in=ref_root_ids).order_by("sent", "id").values_list(
+            "id", flat=True).first()
+        position = max(ref.thread_position for ref in refs) + 1
+
+        # merge the other threads, and any thread this alert was the root of
+        merged_root_ids = (ref_root_ids | {alert.pk}) - {root_id}
+        CapAlertPage.objects.filter(
+            Q(thread_root_id__in=merged_root_ids) | Q(id__in=merged_root_ids - {alert.pk})
+        ).update(thread_root_id=root_id)
+
+    CapAlertPage.objects.filter(pk=alert.pk).update(thread_root_id=root_id, thread_position=position)
+
+    alert.thread_root_id = root_id
+    alert.thread_position = position
+
+
+def get_alert_thread(alert):
+    """All the live alerts in the thread of `alert`, in thread order, with a single query"""
+    from .models import CapAlertPage
+
+    root_id = alert.thread_root_id or alert.pk
+
+    return CapAlertPage.objects.live().filter(Q(thread_root_id=root_id) | Q(pk=root_id)).order_by(
+        "thread_position", "sent", "id").only(*THREAD_ALERT_FIELDS)
+
+
+def serialize_alert_thread(alerts, request=None):
+    alerts = list(alerts)
+
+    def serialize_alert(alert):
+        url = alert.url
+        xml_url = reverse("cap_alert_xml", args=[alert.guid])
+
+        return {
+            "identifier": alert.identifier,
+            "guid": str(alert.guid),
+            "title": alert.title,
+            "msgType": alert.msgType,
+            "sent": alert.sent,
+            "expires": alert.expires,
+            "position": alert.thread_position,
+            "url": get_full_url(request, url) if request and url else url,
+            "xml_url": get_full_url(request, xml_url) if request else xml_url,
+        }
+
+    return {
+        "thread_id": alerts[0].thread_root_id or alerts[0].pk if alerts else None,
+        "latest": serialize_alert(alerts[-1]) if alerts else None,
+        "alerts": [serialize_alert(alert) for alert in alerts],
+    }
@@ -1,8 +1,12 @@
 from django.urls import path
 
+from .api import cap_alerts_api, cap_alert_changes
 from .views import (
     AlertListFeed,
     cap_geojson,
+    cap_alert_facets,
+    cap_alert_search,
+    cap_alert_thread,
     get_home_map_alerts,
     get_latest_active_alert,
     get_cap_xml,
@@ -16,7 +20,12 @@ urlpatterns = [
     path("latest-active-alert/", get_latest_active_alert, name="latest_active_alert"),
     path("api/cap/rss.xml", AlertListFeed(), name="cap_alert_feed"),
     path("api/cap/alerts.geojson", cap_geojson, name="cap_alerts_geojson"),
+    path("api/cap/alerts.json", cap_alerts_api, name="cap_alerts_api"),
+    path("api/cap/changes.json", cap_alert_changes, name="cap_alert_changes"),
+    path("api/cap/facets.json", cap_alert_facets, name="cap_alert_facets"),
+    path("api/cap/search.json", cap_alert_search, name="cap_alert_search"),
     path("api/cap/<uuid:guid>.xml", get_cap_xml, name="cap_alert_xml"),
+    path("api/cap/<uuid:guid>/thread.json", cap_alert_thread, name="cap_alert_thread"),
     path("cap-feed-style.xsl", get_cap_feed_stylesheet, name="cap_feed_stylesheet"),
     path("cap-alert-style.xsl", get_cap_alert_stylesheet, name="cap_alert_stylesheet"),
     path("cap/integrations/", third_party_integration, name="cap_third_party_integration"),
@@ -19,10 +19,10 @@ from wagtail.blocks import StreamValue
 from wagtail.documents import get_document_model
 from wagtail.images import get_image_model
 from wagtail.models import Site
-from wagtailcache.cache import clear_cache
 
 from capcomposer.capeditor.models import CapSetting
 from capcomposer.capeditor.renderers import CapXMLRenderer
+from .cache import clear_alert_cache
 from .exceptions import CAPAlertImportError
 from .sign import sign_cap_xml
 from .static_map import create_alert_area_image
@@ -30,21 +30,18 @@ from .weasyprint_utils import django_url_fetcher
 
 
 def get_all_published_alerts():
-    from .models import CapAlertPage
+    from .models import CapAlertPage, CapAlertReference
     alerts = CapAlertPage.objects.all().live().filter(status="Actual", scope="Public")
     
     # Exclude alerts that have already been cancelled by a published public cancel alert.
-    cancelled_alert_ids = set()
-    cancel_alerts = alerts.filter(msgType="Cancel").only("references")
-    
-    for cancel_alert in cancel_alerts:
-        for reference in cancel_alert.references:
-            ref_alert = reference.value.get("ref_alert")
-            if ref_alert and hasattr(ref_alert, "id"):
-                cancelled_alert_ids.add(ref_alert.id)
+    cancelled_alert_ids = CapAlertReference.objects.filter(
+        kind="Cancel",
+        alert__live=True,
+        alert__status="Actual",
+        alert__scope="Public",
+    ).values("ref_alert_id")
     
-    if cancelled_alert_ids:
-        alerts = alerts.exclude(id__in=cancelled_alert_ids)
+    alerts = alerts.exclude(id__in=cancelled_alert_ids)
     
     return alerts.order_by('-sent')
 
@@ -186,7 +183,66 @@ def create_cap_alert_multi_media(cap_alert_page_id, clear_cache_on_success=False
         logger.info(f"[CAP] CAP Alert MultiMedia content saved for: {cap_alert.title}")
         
         if clear_cache_on_success:
-            clear_cache()
+            clear_alert_cache(cap_alert)
+
+
+def _read_file_bytes(file):
+    if file.closed:
+        file.open('rb')
+    data = file.read()
+    file.close()
+    return data
+
+
+def _build_private_alert_email(recipient, subject, xml_link_full, institution_name, attachments, logo_data=None):
+    from email.mime.image import MIMEImage
+    from django.core.mail import EmailMultiAlternatives
+    from django.conf import settings
+    
+    logo_cid = "logo_image"
+    
+    best_regards = f"<p>Best regards,<br>{institution_name}</p>" if institution_name else "<p>Best regards</p>"
+    body = f"Dear {recipient['name']},\n\nYou have received a private CAP Alert.\n\nXML Link: {xml_link_full}\n\n{best_regards}"
+    html_body = f"<p>Dear {recipient['name']},</p><p>You have received a private CAP Alert.</p><p>XML Link: <a href='{xml_link_full}'>{xml_link_full}</a></p><p>{best_regards}</p>"
+    if logo_data:
+        html_body += f"<p><img src='cid:{logo_cid}' alt='Institution Logo' style='max-width:100px;'/></p>"
+    
+    email_msg = EmailMultiAlternatives(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient['email']])
+    email_msg.attach_alternative(html_body, "text/html")
+    if logo_data:
+        logo_img = MIMEImage(logo_data)
+        logo_img.add_header('Content-ID', f'<{logo_cid}>')
+        logo_img.add_header('Content-Disposition', 'inline', filename='logo.png')
+        email_msg.attach(logo_img)
+    
+    for filename, content, mimetype in attachments:
+        email_msg.attach(filename, content, mimetype)
+    
+    return email_msg
+
+
+def _send_private_alert_email_batch(messages, connection=None):
+    """
+    Send a batch of messages over a single SMTP connection.
+    
+    Returns the number of messages sent. Opens (and closes) its own connection when none is given.
+    """
+    from django.core.mail import get_connection
+    
+    if connection is not None:
+        return connection.send_messages(messages) or 0
+    
+    with get_connection() as connection:
+        return connection.send_messages(messages) or 0
+
+
+def _reopen_email_connection(connection):
+    try:
+        connection.close()
+        connection.open()
+    except OSError as e:
+        # the next batch opens its own connection
+        logger.error(f"[CAP] Could not reopen the email connection: {e}")
 
 
 def send_private_alert_email(alert_id):
@@ -199,9 +255,13 @@ def send_private_alert_email(alert_id):
     
     if alert.status == "Actual" and alert.scope == "Private":
         
-        from django.core.mail import EmailMultiAlternatives
+        from concurrent.futures import ThreadPoolExecutor
+        from django.core.mail import get_connection
         from django.conf import settings
-        from .utils import create_alert_area_image, create_cap_pdf_document
+        
+        batch_size = max(1, getattr(settings, "CAP_PRIVATE_ALERT_EMAIL_BATCH_SIZE", 50))
+        max_workers = max(1, getattr(settings, "CAP_PRIVATE_ALERT_EMAIL_WORKERS", 1))
+        
         recipients = []
         for address in getattr(alert, 'addresses', []):
             name = address.value.get("name")
@@ -236,50 +296,70 @@ def send_private_alert_email(alert_id):
             base_url = getattr(settings, 'BASE_URL', 'http://localhost')
         xml_link_full = f"{base_url}{alert.xml_link}"
         # Get institution name and logo
-        from capcomposer.capeditor.cap_settings import CapSetting
         cap_settings = CapSetting.for_site(site) if site else None
         institution_name = cap_settings.sender_name if cap_settings and cap_settings.sender_name else ""
-        logo_cid = None
         logo_data = None
         if cap_settings and cap_settings.logo and hasattr(cap_settings.logo, 'file'):
-            logo_cid = "logo_image"
-            logo_file = cap_settings.logo.file
-            if logo_file.closed:
-                logo_file.open('rb')
-            logo_data = logo_file.read()
-            logo_file.close()
+            logo_data = _read_file_bytes(cap_settings.logo.file)
         
-        # Compose best regards section
+        # Read attachments once, and share the same bytes across all recipients' messages
+        attachments = []
+        if alert.alert_area_map_image and alert.alert_area_map_image.file:
+            map_data = _read_file_bytes(alert.alert_area_map_image.file)
+            attachments.append((alert.alert_area_map_image.title, map_data, 'image/png'))
+        if alert.alert_pdf_preview and alert.alert_pdf_preview.file:
+            pdf_data = _read_file_bytes(alert.alert_pdf_preview.file)
+            attachments.append((alert.alert_pdf_preview.title, pdf_data, 'application/pdf'))
+        attachments = tuple(attachments)
         
-        for recipient in recipients:
-            best_regards = f"<p>Best regards,<br>{institution_name}</p>" if institution_name else "<p>Best regards</p>"
-            body = f"Dear {recipient['name']},\n\nYou have received a private CAP Alert.\n\nXML Link: {xml_link_full}\n\n{best_regards}"
-            html_body = f"<p>Dear {recipient['name']},</p><p>You have received a private CAP Alert.</p><p>XML Link: <a href='{xml_link_full}'>{xml_link_full}</a></p><p>{best_regards}</p>"
-            if logo_data and logo_cid:
-                html_body += f"<p><img src='cid:{logo_cid}' alt='Institution Logo' style='max-width:100px;'/></p>"
-            
-            email_msg = EmailMultiAlternatives(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient['email']])
-            email_msg.attach_alternative(html_body, "text/html")
-            if logo_data and logo_cid:
-                from email.mime.image import MIMEImage
-                logo_img = MIMEImage(logo_data)
-                logo_img.add_header('Content-ID', f'<{logo_cid}>')
-                logo_img.add_header('Content-Disposition', 'inline', filename='logo.png')
-                email_msg.attach(logo_img)
-            if alert.alert_area_map_image and alert.alert_area_map_image.file:
-                map_file = alert.alert_area_map_image.file
-                if map_file.closed:
-                    map_file.open('rb')
-                map_data = map_file.read()
-                map_file.close()
-                email_msg.attach(alert.alert_area_map_image.title, map_data, 'image/png')
-            if alert.alert_pdf_preview and alert.alert_pdf_preview.file:
-                email_msg.attach(alert.alert_pdf_preview.title, alert.alert_pdf_preview.file.read(), 'application/pdf')
-            
-            from django.core.mail import get_connection
-            
-            connection = get_connection()
-            connection.send_messages([email_msg])
+        if not recipients:
+            logger.warning(f"[CAP] No recipients found for private alert {alert.id}")
+            return
+        
+        messages = [
+            _build_private_alert_email(recipient, subject, xml_link_full, institution_name, attachments, logo_data)
+            for recipient in recipients
+        ]
+        batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+        
+        sent_count = 0
+        failed_batches = []
+        
+        if max_workers == 1 or len(batches) == 1:
+            # one persistent connection for all batches
+            with get_connection() as connection:
+                for index, batch in enumerate(batches):
+                    try:
+                        sent_count += _send_private_alert_email_batch(batch, connection=connection)
+                    except OSError as e:
+                        # SMTP errors, like a dropped connection, which would make all the next batches fail too
+                        logger.error(f"[CAP] Failed to send private alert email batch {index + 1} "
+                                     f"for alert {alert.id}, reconnecting: {e}")
+                        failed_batches.append((index, batch, e))
+                        _reopen_email_connection(connection)
+                    except Exception as e:
+                        logger.error(f"[CAP] Failed to send private alert email batch {index + 1} "
+                                     f"for alert {alert.id}: {e}")
+                        failed_batches.append((index, batch, e))
+        else:
+            # SMTP connections are not thread safe, so each batch gets its own connection
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_send_private_alert_email_batch, batch) for batch in batches]
+                for index, (batch, future) in enumerate(zip(batches, futures)):
+                    try:
+                        sent_count += future.result()
+                    except Exception as e:
+                        logger.error(f"[CAP] Failed to send private alert email batch {index + 1} "
+                                     f"for alert {alert.id}: {e}")
+                        failed_batches.append((index, batch, e))
+        
+        logger.info(f"[CAP] Sent {sent_count} of {len(messages)} private alert emails for alert {alert.id} "
+                    f"in {len(batches)} batch(es)")
+        
+        if failed_batches:
+            failed_recipients = [email for _, batch, _ in failed_batches for msg in batch for email in msg.to]
+            raise Exception(f"Failed to send private alert email to {len(failed_recipients)} recipient(s) "
+                            f"in {len(failed_batches)} batch(es): {', '.join(failed_recipients)}")
 
 
 def get_cap_contact_list_for_site(site):
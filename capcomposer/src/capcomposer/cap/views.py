@@ -1,31 +1,38 @@
+import hashlib
 import json
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.syndication.views import Feed
+from django.core.exceptions import PermissionDenied
 from django.core.validators import validate_email
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse, Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.feedgenerator import Rss201rev2Feed
 from django.utils.feedgenerator import rfc2822_date
-from django.utils.translation import gettext as _
+from django.utils.translation import gettext as _, get_language
 from django.utils.xmlutils import SimplerXMLGenerator
 from wagtail.admin import messages
 from wagtail.api.v2.utils import get_full_url
+from wagtail.models import Site
 from wagtail_modeladmin.helpers import AdminURLHelper
 import markdown
 
 from capcomposer.capeditor.constants import SEVERITY_MAPPING
-from capcomposer.capeditor.models import CapSetting
-from capcomposer.capeditor.utils import get_event_info
-from .cache import wagcache
+from capcomposer.capeditor.models import CapSetting, get_event_infos_for_site
+from capcomposer.capeditor.utils import DEFAULT_EVENT_INFO
+from .cache import wagcache, get_alerts_cache_version, get_site_cache_key, get_site_settings_version
+from .export import astream_cap_xml_zip
+from .facets import get_alert_facets
+from .http import conditional_response, parse_since
 from .models import (
     CapAlertPage,
     CapAlertListPage,
     OtherCAPSettings,
 )
+from .search import search_alerts
 from .statistics import _get_filtered_queryset, get_alert_statistics, export_alerts_csv
 from .stats_theme import (
     get_stats_theme,
@@ -33,6 +40,7 @@ from .stats_theme import (
     get_certainty_colors,
     get_event_colors,
 )
+from .threads import get_alert_thread, serialize_alert_thread
 from .utils import get_full_url_by_site, create_cap_alert_multi_media, send_private_alert_email
 from .utils import (
     serialize_and_sign_cap_alert,
@@ -41,6 +49,17 @@ from .utils import (
 )
 
 
+# stylesheets are cached for 5 days, and can be reused by browsers and proxies for a day before revalidating
+STYLESHEET_CACHE_TIMEOUT = 60 * 60 * 24 * 5
+STYLESHEET_MAX_AGE = 60 * 60 * 24
+
+SEARCH_RESULTS_LIMIT = 20
+SEARCH_RESULTS_MAX_LIMIT = 100
+
+# upper bound for how long the rendered feed is cached. It is dropped sooner when alerts or settings change
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
 class CustomCAPFeed(Rss201rev2Feed):
     content_type = 'application/xml'
     
@@ -99,9 +118,54 @@ class AlertListFeed(Feed):
     
     feed_type = CustomCAPFeed
     
+    cap_setting = None
+    since = None
+    
     def __call__(self, request, *args, **kwargs):
-        self.cap_setting = CapSetting.for_request(request)
-        return super().__call__(request, *args, **kwargs)
+        since = None
+        if request.GET.get("since"):
+            since = parse_since(request.GET.get("since"))
+            if since is None:
+                return HttpResponseBadRequest(_("Invalid 'since' value. Use an ISO 8601 date or datetime"))
+        
+        # urls mount a single instance, shared by the threads serving concurrent requests, so the
+        # per-request state goes on a fresh instance
+        feed_view = type(self)()
+        feed_view.cap_setting = CapSetting.for_request(request)
+        feed_view.since = since
+        
+        # delta feeds are small and depend on the client's 'since', so only the full feed is cached
+        if since:
+            feed = feed_view.build_feed(request, *args, **kwargs)
+        else:
+            site = feed_view.cap_setting.site
+            if self.is_scoped_to_site(site):
+                cache_key = get_site_cache_key(site, "alert_feed")
+            else:
+                # the feed lists the alerts of all sites, so it goes stale when any of them changes
+                cache_key = get_site_cache_key(site, "alert_feed", f"a{get_alerts_cache_version()}")
+            feed = wagcache.get(cache_key)
+            
+            if feed is None:
+                feed = feed_view.build_feed(request, *args, **kwargs)
+                wagcache.set(cache_key, feed, FEED_CACHE_TIMEOUT)
+        
+        return conditional_response(request, feed["content"], feed["content_type"], etag=feed["etag"],
+                                    last_modified=feed["last_modified"])
+    
+    def build_feed(self, request, *args, **kwargs):
+        response = super().__call__(request, *args, **kwargs)
+        
+        # the build time rather than the latest alert, as the feed also changes when alerts are cancelled
+        # or settings change
+        last_modified = timezone.now()
+        
+        return {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "etag": hashlib.sha256(response.content).hexdigest(),
+            "last_modified": int(last_modified.timestamp()),
+        }
     
     def link(self):
         path = reverse("cap_alert_feed")
@@ -120,6 +184,11 @@ class AlertListFeed(Feed):
             description = _("Latest alerts from %(sender_name)s") % {"sender_name": self.cap_setting.sender_name}
         return description
     
+    @staticmethod
+    def is_scoped_to_site(site):
+        """Whether the feed only lists the alerts of `site`, when its root page is the alert list"""
+        return site.root_page.specific_class == CapAlertListPage
+    
     def items(self):
         num_of_latest_alerts_in_feed = self.cap_setting.num_of_latest_alerts_in_feed
         site = self.cap_setting.site
@@ -127,9 +196,12 @@ class AlertListFeed(Feed):
         # get latest alerts, limit to num_of_latest_alerts_in_feed
         alerts = get_all_published_alerts()
         
-        if site.root_page.specific_class == CapAlertListPage:
+        if self.is_scoped_to_site(site):
             alerts = alerts.child_of(site.root_page)
         
+        if self.since:
+            alerts = alerts.filter(sent__gt=self.since)
+        
         alerts = alerts[:num_of_latest_alerts_in_feed]
         
         return alerts
@@ -198,33 +270,48 @@ def get_cap_xml(request, guid):
     return HttpResponse(xml, content_type="application/xml")
 
 
-def get_cap_feed_stylesheet(request):
-    stylesheet = wagcache.get("cap_feed_stylesheet")
+def _stylesheet_response(request, cache_key, render):
+    stylesheet = wagcache.get(cache_key)
     
     if not stylesheet:
-        stylesheet = render_to_string("cap/cap-feed-stylesheet.html").strip()
-        # cache for 5 days
-        wagcache.set("cap_feed_stylesheet", stylesheet, 60 * 60 * 24 * 5)
+        content = render()
+        stylesheet = {
+            "content": content,
+            "etag": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        }
+        wagcache.set(cache_key, stylesheet, STYLESHEET_CACHE_TIMEOUT)
+    
+    return conditional_response(request, stylesheet["content"], "application/xml", etag=stylesheet["etag"],
+                                cache_control={"public": True, "max_age": STYLESHEET_MAX_AGE})
+
+
+def get_cap_feed_stylesheet(request):
+    # the feed stylesheet has no site specific content, so one entry per language is shared by all sites
+    cache_key = f"cap_feed_stylesheet_{get_language()}"
     
-    return HttpResponse(stylesheet, content_type="application/xml")
+    return _stylesheet_response(request, cache_key,
+                                lambda: render_to_string("cap/cap-feed-stylesheet.html").strip())
+
 
 def get_cap_alert_stylesheet(request):
-    context = {}
-    cap_settings = CapSetting.for_request(request)
-    if cap_settings.logo:
-        context.update({
-            "logo": cap_settings.logo,
-            "sender_name": cap_settings.sender_name
-        })
+    site = Site.find_for_request(request)
     
-    stylesheet = wagcache.get("cap_alert_stylesheet")
+    def render():
+        context = {}
+        cap_settings = CapSetting.for_request(request)
+        if cap_settings.logo:
+            context.update({
+                "logo": cap_settings.logo,
+                "sender_name": cap_settings.sender_name
+            })
+        return render_to_string("cap/cap-alert-stylesheet.html", context=context).strip()
     
-    if not stylesheet:
-        stylesheet = render_to_string("cap/cap-alert-stylesheet.html", context=context).strip()
-        # cache for 5 days
-        wagcache.set("cap_alert_stylesheet", stylesheet, 60 * 60 * 24 * 5)
+    if not site:
+        return HttpResponse(render(), content_type="application/xml")
     
-    return HttpResponse(stylesheet, content_type="application/xml")
+    cache_key = f"cap_alert_stylesheet_{site.pk}_v{get_site_settings_version(site)}_{get_language()}"
+    
+    return _stylesheet_response(request, cache_key, render)
 
 
 def cap_geojson(request):
@@ -243,6 +330,63 @@ def cap_geojson(request):
     return JsonResponse(geojson)
 
 
+def cap_alert_thread(request, guid):
+    """The incident thread of a public alert, from the first message to the latest"""
+    public_alerts = CapAlertPage.objects.live().filter(status="Actual", scope="Public")
+    alert = get_object_or_404(public_alerts, guid=guid)
+    
+    thread = get_alert_thread(alert).filter(status="Actual", scope="Public")
+    
+    return JsonResponse(serialize_alert_thread(thread, request=request))
+
+
+def cap_alert_search(request):
+    """Full text search over the published alerts of the site, best match first"""
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": _("The 'q' parameter is required")}, status=400)
+    
+    site = Site.find_for_request(request)
+    if not site:
+        return JsonResponse({"error": "Site not found"}, status=404)
+    
+    try:
+        limit = min(int(request.GET.get("limit", SEARCH_RESULTS_LIMIT)), SEARCH_RESULTS_MAX_LIMIT)
+    except ValueError:
+        limit = SEARCH_RESULTS_LIMIT
+    
+    alerts = get_all_published_alerts().descendant_of(site.root_page, inclusive=True)
+    alerts = search_alerts(alerts, query, language=request.GET.get("lang"))
+    alerts = alerts.only("id", "title", "slug", "url_path", "path", "depth", "locale", "content_type", "guid", "sent",
+                         "expires", "event", "severity", "cap_identifier")[:max(limit, 1)]
+    
+    results = []
+    for alert in alerts:
+        results.append({
+            "identifier": alert.identifier,
+            "title": alert.title,
+            "event": alert.event,
+            "severity": alert.severity,
+            "sent": alert.sent,
+            "expires": alert.expires,
+            "rank": alert.search_rank,
+            "url": get_full_url(request, alert.url),
+            "xml_url": get_full_url(request, reverse("cap_alert_xml", args=[alert.guid])),
+        })
+    
+    return JsonResponse({"query": query, "results": results})
+
+
+def cap_alert_facets(request):
+    """Severity, event type and status counts of the site's published alerts"""
+    site = Site.find_for_request(request)
+    
+    if not site:
+        return JsonResponse({"error": "Site not found"}, status=404)
+    
+    return JsonResponse(get_alert_facets(site))
+
+
 def get_home_map_alerts(request):
     alerts = get_currently_active_alerts()
     active_alert_infos = []
@@ -251,6 +395,9 @@ def get_home_map_alerts(request):
     cap_settings = OtherCAPSettings.for_request(request)
     default_alert_display_language = cap_settings.default_alert_display_language
     
+    # load the event infos once for all alerts
+    event_infos = get_event_infos_for_site(Site.find_for_request(request), request=request)
+    
     for alert in alerts:
         # take the first info
         info = alert.info[0]
@@ -275,7 +422,7 @@ def get_home_map_alerts(request):
         
         event = info.value.get('event')
         
-        event_info = get_event_info(event, request=request)
+        event_info = event_infos.get(event) or DEFAULT_EVENT_INFO
         
         event_icon = event_info.get("icon")
         
@@ -320,10 +467,11 @@ def get_latest_active_alert(request):
     context = {}
     
     for alert in alerts:
-        default_alert_info = alert.infos[0]
+        infos = alert.get_infos(request=request)
+        default_alert_info = infos[0]
         
         if default_alert_display_language and len(alert.info) > 1:
-            for info_item in alert.infos:
+            for info_item in infos:
                 info_lang = info_item.get("info").value.get("language")
                 if info_lang == default_alert_display_language.code or info_lang.startswith(
                         default_alert_display_language.code):
@@ -422,6 +570,29 @@ def third_party_integration(request):
     return render(request, "cap/third_party_integration.html", context)
 
 
+@login_required
+def alert_thread_view(request, alert_id):
+    """Admin view of the incident thread of an alert"""
+    if not request.user.has_perm("cap.can_view_alerts_menu"):
+        raise PermissionDenied
+    
+    alert = get_object_or_404(CapAlertPage, id=alert_id)
+    
+    # Site scoping: the alert must belong to the current request's site.
+    current_site = Site.find_for_request(request)
+    if not current_site or alert.get_site() != current_site:
+        raise Http404("Alert not found for this site")
+    thread = list(get_alert_thread(alert))
+    
+    context = {
+        "alert": alert,
+        "thread": thread,
+        "alerts_index_url": AdminURLHelper(CapAlertPage).get_action_url("index"),
+    }
+    
+    return render(request, "cap/alert_thread.html", context)
+
+
 @login_required
 def cap_statistics_view(request):
     """Render the CAP alert statistics admin page."""
@@ -455,6 +626,7 @@ def cap_statistics_view(request):
         "selected_severities": request.GET.getlist("severity"),
         "severity_choices": ["Extreme", "Severe", "Moderate", "Minor"],
         "export_csv_url": reverse("cap_statistics_export_csv"),
+        "export_xml_url": reverse("cap_statistics_export_xml"),
         "trend_labels_json": json.dumps([row["label"] for row in trend]),
         "trend_data_json": json.dumps([row["count"] for row in trend]),
         "severity_labels_json": json.dumps(list(stats["by_severity"].keys())),
@@ -496,3 +668,13 @@ def cap_statistics_export_csv(request):
     response = HttpResponse(csv_content, content_type="text/csv")
     response["Content-Disposition"] = 'attachment; filename="cap_alerts_statistics.csv"'
     return response
+
+
+@login_required
+def cap_statistics_export_xml(request):
+    """Stream a ZIP of the CAP XML of the filtered published alerts."""
+    queryset = _get_filtered_queryset(request).live()
+
+    response = StreamingHttpResponse(astream_cap_xml_zip(queryset, request), content_type="application/zip")
+    response["Content-Disposition"] = 'attachment; filename="cap_alerts.zip"'
+    return response
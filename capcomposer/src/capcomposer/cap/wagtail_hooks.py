@@ -17,6 +17,7 @@ from wagtail.admin.menu import MenuItem, Menu
 from wagtail.models import Page, Site
 from wagtail_modeladmin.helpers import AdminURLHelper
 from wagtail_modeladmin.helpers import (
+    BaseSearchHandler,
     PagePermissionHelper,
     PermissionHelper,
     PageButtonHelper,
@@ -42,10 +43,18 @@ from .models import (
 
 )
 from .republish import republish_mqtt_event, republish_webhook_event, disseminations_view
+from .search import search_alerts
 from .utils import (
     create_draft_alert_from_alert_data
 )
-from .views import create_cap_png_pdf, send_private_alert_email_view, cap_statistics_view, cap_statistics_export_csv
+from .views import (
+    create_cap_png_pdf,
+    send_private_alert_email_view,
+    cap_statistics_view,
+    cap_statistics_export_csv,
+    cap_statistics_export_xml,
+    alert_thread_view,
+)
 
 CAN_EDIT_CAP = getattr(settings, "CAP_ALLOW_EDITING", False)
 
@@ -58,9 +67,11 @@ def urlconf_cap():
              name='send_private_alert_email'),
         path('cap/statistics/', cap_statistics_view, name='cap_statistics'),
         path('cap/statistics/export/csv/', cap_statistics_export_csv, name='cap_statistics_export_csv'),
+        path('cap/statistics/export/xml/', cap_statistics_export_xml, name='cap_statistics_export_xml'),
         path('cap/republish/mqtt/<int:event_id>/', republish_mqtt_event, name='republish_mqtt_event'),
         path('cap/republish/webhook/<int:event_id>/', republish_webhook_event, name='republish_webhook_event'),
         path('cap/disseminations/<int:alert_id>/', disseminations_view, name='cap_disseminations'),
+        path('cap/thread/<int:alert_id>/', alert_thread_view, name='cap_alert_thread_admin'),
     ]
 
 
@@ -133,6 +144,19 @@ class CAPAlertPageButtonHelper(PageButtonHelper):
         return buttons
 
 
+class AlertSearchHandler(BaseSearchHandler):
+    """Alerts search, over the full text index of the alert infos, best match first"""
+    
+    def search_queryset(self, queryset, search_term, **kwargs):
+        if not search_term:
+            return queryset
+        return search_alerts(queryset, search_term)
+    
+    @property
+    def show_search_form(self):
+        return True
+
+
 class CAPAdmin(ModelAdmin):
     model = CapAlertPage
     menu_label = _('Alerts')
@@ -144,6 +168,7 @@ class CAPAdmin(ModelAdmin):
     button_helper_class = CAPAlertPageButtonHelper
     list_display_add_buttons = "__str__"
     list_filter = ("live", "msgType", "sent")
+    search_handler_class = AlertSearchHandler
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -435,6 +460,12 @@ def cap_page_listing_buttons(page, user, next_url=None):
                 reverse("cap_disseminations", args=[page.pk]),
                 priority=12,
             )
+        if page.live:
+            yield wagtailadmin_widgets.PageListingButton(
+                _("Thread"),
+                reverse("cap_alert_thread_admin", args=[page.pk]),
+                priority=13,
+            )
         if page.is_private_scope:
             yield wagtailadmin_widgets.PageListingButton(
                 _("Email Recipients"),
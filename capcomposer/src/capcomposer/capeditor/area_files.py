@@ -0,0 +1,222 @@
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import shapely
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from shapely import MultiPolygon, Polygon
+from shapely.geometry import mapping, shape
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# where uploads converted in the background are kept until converted
+AREA_FILE_UPLOAD_DIR = "cap_area_uploads"
+
+# how long the status and result of a background conversion are kept, for the editor to poll them
+AREA_FILE_STATUS_TIMEOUT = 60 * 60
+
+# features read between progress updates
+AREA_FILE_PROGRESS_STEP = 100
+
+GEOJSON_EXTENSIONS = (".geojson", ".json")
+SHAPEFILE_EXTENSIONS = (".zip",)
+
+
+class AreaFileError(ValueError):
+    pass
+
+
+def get_area_file_max_size():
+    return getattr(settings, "CAP_AREA_FILE_MAX_SIZE", 50 * 1024 * 1024)
+
+
+def get_area_file_max_vertices():
+    return getattr(settings, "CAP_AREA_FILE_MAX_VERTICES", 1000000)
+
+
+def get_area_file_async_size():
+    return getattr(settings, "CAP_AREA_FILE_ASYNC_SIZE", 2 * 1024 * 1024)
+
+
+def check_area_file(filename, size):
+    """Raise an AreaFileError if an upload can not be converted, before reading it"""
+    filename = filename.lower()
+    if not filename.endswith(GEOJSON_EXTENSIONS + SHAPEFILE_EXTENSIONS):
+        raise AreaFileError("Unsupported file format. Please upload .geojson, .json, or .zip (shapefile)")
+
+    max_size = get_area_file_max_size()
+    if size > max_size:
+        raise AreaFileError(f"The file is too large. The maximum size is {max_size // (1024 * 1024)} MB")
+
+
+def _get_geojson_root_type(fileobj):
+    # FeatureCollection members can come in any order, so 'type' may come after the features
+    for prefix, event, value in ijson.parse(fileobj):
+        if prefix == "type" and event == "string":
+            return value
+    return None
+
+
+def _iter_geojson_geometries(path, progress):
+    size = os.path.getsize(path) or 1
+
+    with open(path, "rb") as fileobj:
+        if ijson is None:
+            data = json.load(fileobj)
+            root_type = data.get("type")
+            if root_type == "FeatureCollection":
+                geometries = (feature.get("geometry") for feature in data.get("features") or [])
+            elif root_type == "Feature":
+                geometries = [data.get("geometry")]
+            else:
+                geometries = [data]
+        else:
+            root_type = _get_geojson_root_type(fileobj)
+            fileobj.seek(0)
+            if root_type == "FeatureCollection":
+                geometries = ijson.items(fileobj, "features.item.geometry", use_float=True)
+            elif root_type == "Feature":
+                geometries = ijson.items(fileobj, "geometry", use_float=True)
+            else:
+                geometries = ijson.items(fileobj, "", use_float=True)
+
+        for index, geometry in enumerate(geometries):
+            if progress and index % AREA_FILE_PROGRESS_STEP == 0:
+                progress(fileobj.tell() / size)
+            yield geometry
+
+
+def _iter_shapefile_geometries(path, progress):
+    import fiona
+    from fiona.transform import transform_geom
+
+    with fiona.open(f"zip://{path}") as src:
+        src_crs = src.crs
+        need_reproject = src_crs is not None and src_crs.to_epsg() != 4326
+        total = len(src) or 1
+
+        for index, feature in enumerate(src):
+            if progress and index % AREA_FILE_PROGRESS_STEP == 0:
+                progress(index / total)
+
+            if feature.geometry is None:
+                continue
+
+            geometry = feature.geometry
+            if need_reproject:
+                geometry = transform_geom(src_crs, "EPSG:4326", geometry)
+            yield dict(geometry)
+
+
+def _iter_polygons(geometry):
+    if isinstance(geometry, Polygon):
+        yield geometry
+    elif isinstance(geometry, MultiPolygon):
+        yield from geometry.geoms
+
+
+def read_area_file(path, filename, dissolve=False, simplify=None, progress=None):
+    """
+    Read the polygons of a GeoJSON or zipped shapefile into a MultiPolygon GeoJSON geometry.
+
+    Features are read one at a time, from fiona for shapefiles and ijson for GeoJSON, and each is
+    simplified with the `simplify` tolerance, in degrees, as it is read. Reading stops once the
+    polygons have more than CAP_AREA_FILE_MAX_VERTICES vertices. With `dissolve`, the polygons are
+    merged, dropping the boundaries between adjacent features. `progress` is called with the share
+    of the file read so far.
+    """
+    max_vertices = get_area_file_max_vertices()
+    is_shapefile = filename.lower().endswith(SHAPEFILE_EXTENSIONS)
+
+    geometries = (_iter_shapefile_geometries if is_shapefile else _iter_geojson_geometries)(path, progress)
+
+    polygons = []
+    vertices = 0
+    for geojson in geometries:
+        if not geojson or geojson.get("type") not in ("Polygon", "MultiPolygon"):
+            continue
+
+        geometry = shape(geojson)
+        if simplify:
+            geometry = shapely.simplify(geometry, simplify, preserve_topology=True)
+
+        for polygon in _iter_polygons(geometry):
+            vertices += shapely.get_num_coordinates(polygon)
+            if vertices > max_vertices:
+                raise AreaFileError(
+                    f"The file has more than {max_vertices} vertices. Simplify it, or upload fewer areas"
+                )
+            polygons.append(polygon)
+
+    if not polygons:
+        raise AreaFileError("No Polygon or MultiPolygon geometries found")
+
+    if dissolve and len(polygons) > 1:
+        polygons = list(_iter_polygons(shapely.union_all(polygons)))
+
+    return mapping(MultiPolygon(polygons))
+
+
+@contextmanager
+def _local_path(name):
+    # fiona and ijson need a local file, which remote storages do not have
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        path = None
+
+    if path:
+        yield path
+    else:
+        suffix = os.path.splitext(name)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+            with default_storage.open(name, "rb") as src:
+                shutil.copyfileobj(src, tmp)
+            tmp.flush()
+            yield tmp.name
+
+
+def save_area_file(uploaded_file, token):
+    """Save an upload to the default storage, for a worker to convert it. Returns its storage name"""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    return default_storage.save(f"{AREA_FILE_UPLOAD_DIR}/{token}{extension}", uploaded_file)
+
+
+def get_area_file_status_key(token):
+    return f"cap_area_file_{token}"
+
+
+def get_area_file_status(token):
+    return cache.get(get_area_file_status_key(token))
+
+
+def set_area_file_status(token, user_id, status, **data):
+    cache.set(get_area_file_status_key(token), {"user_id": user_id, "status": status, **data},
+              AREA_FILE_STATUS_TIMEOUT)
+
+
+def convert_stored_area_file(token, name, user_id, dissolve=False, simplify=None):
+    """
+    Convert an upload saved with `save_area_file`, keeping the status of the conversion in the
+    cache under `token`, for the editor to poll. The upload is deleted once converted.
+    """
+
+    def progress(value):
+        set_area_file_status(token, user_id, "running", progress=round(value, 2))
+
+    try:
+        progress(0)
+        with _local_path(name) as path:
+            geometry = read_area_file(path, name, dissolve=dissolve, simplify=simplify, progress=progress)
+        set_area_file_status(token, user_id, "done", progress=1, geometry=geometry)
+    except Exception as e:
+        set_area_file_status(token, user_id, "error", error=str(e))
+    finally:
+        default_storage.delete(name)
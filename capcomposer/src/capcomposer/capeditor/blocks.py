@@ -21,7 +21,8 @@ from .forms.fields import (
     PolygonOrMultiPolygonField
 )
 from .forms.widgets import CircleWidget, EventCodeWidget
-from .serializers import parse_tz
+from .geometry import cap_polygons, find_overlapping_geometries, get_simplified_geojson
+from .serializers import format_alert_reference
 from .utils import file_path_mime
 
 
@@ -123,8 +124,7 @@ class AlertReferenceStructValue(StructValue):
     def ref_alert_identifier(self):
         alert_page = self.get("ref_alert").specific
         if hasattr(alert_page, "sender") and hasattr(alert_page, "identifier") and hasattr(alert_page, "sent"):
-            sent = parse_tz(alert_page.sent.isoformat())
-            return "{},{},{}".format(alert_page.sender, alert_page.identifier, sent)
+            return format_alert_reference(alert_page)
         
         return None
 
@@ -514,14 +514,29 @@ class AlertInfoStructValue(StructValue):
             return resources
         return None
     
+    @cached_property
+    def simplified_geojson(self):
+        """
+        Geometries of the area blocks, in order, simplified to fit the CAP area vertex budget, or
+        None for areas without a geometry. The original geometries are kept for display.
+        """
+        area_blocks = self.get("area") or []
+        geojsons = [area.value.geojson for area in area_blocks]
+        
+        simplified = iter(get_simplified_geojson([geojson for geojson in geojsons if geojson]))
+        return [next(simplified) if geojson else None for geojson in geojsons]
+    
     @cached_property
     def area(self):
         area_blocks = self.get("area")
         areas = []
         
         if area_blocks:
-            for area in area_blocks:
-                areas.append(area.value.area)
+            for area, geojson in zip(area_blocks, self.simplified_geojson):
+                area_data = area.value.area
+                if geojson:
+                    area_data = {**area_data, "polygons": cap_polygons(shape(geojson))}
+                areas.append(area_data)
             return areas
     
     @cached_property
@@ -548,23 +563,33 @@ class AlertInfoStructValue(StructValue):
             'event': event_blocks
         }
     
-    @cached_property
-    def features(self):
+    def get_features(self, simplified=True):
         area_blocks = self.get("area")
         
         features = []
         
         if area_blocks:
-            for feature in area_blocks:
-                if feature.value.geojson:
+            geometries = self.simplified_geojson if simplified else [area.value.geojson for area in area_blocks]
+            for feature, geometry in zip(area_blocks, geometries):
+                if geometry:
                     features.append({
                         "type": "Feature",
-                        "geometry": feature.value.geojson,
+                        "geometry": geometry,
                         "properties": {
                             "areaDesc": feature.value.area.get('areaDesc'),
                             **self.area_properties}
                     })
         return features
+    
+    @cached_property
+    def features(self):
+        """Area features, with geometries simplified to fit the CAP area vertex budget"""
+        return self.get_features()
+    
+    @cached_property
+    def display_features(self):
+        """Area features, with the original geometries"""
+        return self.get_features(simplified=False)
 
 
 # get list of institution defined hazards types as list of choices
@@ -619,27 +644,16 @@ class EventCodeBlock(blocks.TextBlock):
         return forms.CharField(**field_kwargs)
 
 
-def check_area_intersections(area_blocks):
-    geometries = []
-    for area in area_blocks:
-        geojson = area.value.geojson
-        if geojson:
-            geometries.append((area, shape(geojson)))
+def check_area_intersections(area_blocks, min_area=1000):
+    """
+    Error message if areas of the alert overlap by more than `min_area` m², None otherwise.
+    Areas sharing a boundary, like adjacent districts, do not overlap.
+    """
+    geometries = [shape(area.value.geojson) for area in area_blocks if area.value.geojson]
     
-    for i in range(len(geometries)):
-        for j in range(i + 1, len(geometries)):
-            _, geom_i = geometries[i]
-            _, geom_j = geometries[j]
-            
-            if geom_i.intersects(geom_j):
-                intersection = geom_i.intersection(geom_j)
-                # intersection.area is in degrees² — convert to m²
-                # at equator, 1 degree² ≈ 1.23e10 m²
-                # 1000 sqm threshold ≈ 8e-8 degrees²
-                intersection_area_m2 = intersection.area * 1.23e10
-                if intersection_area_m2 > 1000:
-                    return _("Alert area polygons must not overlap each other. "
-                             "Intersecting areas are not allowed.")
+    if find_overlapping_geometries(geometries, min_area=min_area):
+        return _("Alert area polygons must not overlap each other. "
+                 "CAP does not allow intersecting areas.")
     
     return None
 
@@ -757,29 +771,11 @@ class AlertInfo(blocks.StructBlock):
         # Check for intersections between area blocks
         area_blocks = result.get("area")
         if area_blocks:
-            geometries = []
-            for area in area_blocks:
-                geojson = area.value.geojson
-                if geojson:
-                    geometries.append((area, shape(geojson)))
-            
-            for i in range(len(geometries)):
-                for j in range(i + 1, len(geometries)):
-                    _, geom_i = geometries[i]
-                    _, geom_j = geometries[j]
-                    
-                    if geom_i.intersects(geom_j):
-                        intersection = geom_i.intersection(geom_j)
-                        # Convert degrees² to m² (approx, valid for equatorial regions)
-                        intersection_area_m2 = intersection.area * 1.23e10
-                        
-                        if intersection_area_m2 > intersection_area_threshold:
-                            raise StructBlockValidationError(block_errors={
-                                "area": ValidationError(
-                                    _("Alert area polygons must not overlap each other. "
-                                      "CAP does not allow intersecting areas.")
-                                )
-                            })
+            error = check_area_intersections(area_blocks, min_area=intersection_area_threshold)
+            if error:
+                raise StructBlockValidationError(block_errors={
+                    "area": ValidationError(error)
+                })
         
         return result
     
@@ -11,6 +11,7 @@ from capcomposer.capeditor.forms.widgets import (
 from django.contrib.gis.db import models
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import post_save, post_delete
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from modelcluster.fields import ParentalKey
@@ -23,6 +24,9 @@ from wagtail.models import Orderable
 from wagtailiconchooser.widgets import IconChooserWidget
 from wagtailmodelchooser import register_model_chooser
 
+from .tiles import bump_area_tiles_version
+from .un_boundary import DEFAULT_UN_BOUNDARY_RESOLUTION, UN_BOUNDARY_RESOLUTIONS, update_un_boundary_variants
+
 
 @register_setting
 class CapSetting(BaseSiteSetting, ClusterableModel):
@@ -241,3 +245,39 @@ class AlertLanguage(Orderable):
     def save(self, *args, **kwargs):
         self.code = self.code.lower()
         super().save(*args, **kwargs)
+
+
+class UNBoundaryVariant(models.Model):
+    """Simplified and pre-gzipped UN boundary of CAP settings, built when the settings are saved"""
+    setting = models.ForeignKey(CapSetting, on_delete=models.CASCADE, related_name="un_boundary_variants")
+    resolution = models.CharField(max_length=20,
+                                  choices=[(resolution, resolution) for resolution in UN_BOUNDARY_RESOLUTIONS])
+    content_hash = models.CharField(max_length=64)
+    content = models.BinaryField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["setting", "resolution"], name="unique_setting_un_boundary_resolution"),
+        ]
+    
+    def __str__(self):
+        return f"{self.setting} - {self.resolution}"
+    
+    @classmethod
+    def for_setting(cls, setting, resolution=DEFAULT_UN_BOUNDARY_RESOLUTION):
+        return cls.objects.filter(setting=setting, resolution=resolution).defer("content").first()
+
+
+def on_change_predefined_alert_area(sender, instance, **kwargs):
+    setting = CapSetting.objects.filter(pk=instance.setting_id).only("site_id").first()
+    if setting:
+        bump_area_tiles_version(setting.site_id)
+
+
+def on_save_cap_setting_un_boundary(sender, instance, **kwargs):
+    update_un_boundary_variants(instance)
+
+
+post_save.connect(on_save_cap_setting_un_boundary, sender=CapSetting)
+post_save.connect(on_change_predefined_alert_area, sender=PredefinedAlertArea)
+post_delete.connect(on_change_predefined_alert_area, sender=PredefinedAlertArea)
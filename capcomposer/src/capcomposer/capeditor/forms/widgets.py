@@ -2,6 +2,7 @@ import json
 
 from capcomposer.capeditor.constants import WMO_HAZARD_EVENTS_TYPE_CHOICES
 from capcomposer.capeditor.oet_v1_2 import OASIS_EVENT_TERMS_AS_CHOICES
+from capcomposer.capeditor.un_boundary import UN_BOUNDARY_DISPLAY_RESOLUTION
 from django.contrib.gis.forms import BaseGeometryWidget
 from django.contrib.gis.geometry import json_regex
 from django.forms import Textarea, Widget, TextInput, Media
@@ -27,9 +28,13 @@ class BaseMapWidget(Widget):
 class UNBoundaryWidgetMixin(Widget):
     def get_context(self, *args, **kwargs):
         context = super().get_context(*args, **kwargs)
-        un_geojson_url = reverse("un_boundary_geojson")
+        # the boundary outline is drawn from a simplified variant, while drawn areas are snapped
+        # and checked against the exact boundary, loaded on the first check
+        un_geojson_url = f'{reverse("un_boundary_geojson")}?resolution=full'
+        un_geojson_display_url = f'{reverse("un_boundary_geojson")}?resolution={UN_BOUNDARY_DISPLAY_RESOLUTION}'
         context.update({
-            "un_geojson_url": un_geojson_url
+            "un_geojson_url": un_geojson_url,
+            "un_geojson_display_url": un_geojson_display_url,
         })
         return context
 
@@ -237,6 +242,8 @@ class MultiPolygonWidget(BasePolygonWidget, BaseMapWidget, UNBoundaryWidgetMixin
     def get_context(self, *args, **kwargs):
         context = super().get_context(*args, **kwargs)
         context["convert_area_file_url"] = reverse("convert_area_file")
+        # tiles url template, for maplibre to fill in the tile coordinates
+        context["area_tiles_url"] = reverse("cap_area_tile", args=[0, 0, 0]).replace("/0/0/0.mvt", "/{z}/{x}/{y}.mvt")
         return context
 
     def serialize(self, value):
@@ -0,0 +1,148 @@
+import hashlib
+
+import numpy as np
+import shapely
+from django.conf import settings
+from django.core.cache import cache
+from shapely import Polygon, STRtree
+from shapely.geometry import mapping, shape
+
+# mean earth radius, in meters
+EARTH_RADIUS = 6371008.8
+
+# simplified area geometries only depend on the original ones, so they can be kept long
+SIMPLIFIED_AREAS_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# times the simplification tolerance is doubled to fit the vertex budget, before giving up
+SIMPLIFY_MAX_STEPS = 12
+
+
+def get_area_vertex_budget():
+    return getattr(settings, "CAP_AREA_VERTEX_BUDGET", 5000)
+
+
+def get_area_simplify_tolerance():
+    return getattr(settings, "CAP_AREA_SIMPLIFY_TOLERANCE", 0.0001)
+
+
+def _lambert_cylindrical_equal_area(coords):
+    lon = np.radians(coords[:, 0])
+    lat = np.radians(np.clip(coords[:, 1], -90, 90))
+    return np.column_stack([EARTH_RADIUS * lon, EARTH_RADIUS * np.sin(lat)])
+
+
+def to_equal_area(geometry):
+    """
+    Project WGS84 geometries to the Lambert cylindrical equal-area projection.
+
+    Areas of the projected geometries are their areas on the sphere in m², at any latitude, unlike
+    areas of lon/lat geometries in degrees².
+    """
+    return shapely.transform(geometry, _lambert_cylindrical_equal_area)
+
+
+def geodesic_area(geometry):
+    """Area in m² of WGS84 geometries"""
+    return shapely.area(to_equal_area(geometry))
+
+
+def find_overlapping_geometries(geometries, min_area=1000):
+    """
+    Pairs of indices of WGS84 geometries whose interiors overlap by more than `min_area` m².
+
+    Candidate pairs come from an STRtree of the geometry bounding boxes, instead of comparing all
+    pairs. Only the candidates whose interiors intersect, as opposed to adjacent areas sharing a
+    boundary, get their intersection computed.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if len(geometries) < 2:
+        return []
+
+    shapely.prepare(geometries)
+    tree = STRtree(geometries)
+
+    left, right = tree.query(geometries, predicate="intersects")
+    # each pair once, and not a geometry with itself
+    candidates = left < right
+    left, right = left[candidates], right[candidates]
+    if not len(left):
+        return []
+
+    interiors_intersect = shapely.relate_pattern(geometries[left], geometries[right], "T********")
+    left, right = left[interiors_intersect], right[interiors_intersect]
+    if not len(left):
+        return []
+
+    areas = geodesic_area(shapely.intersection(geometries[left], geometries[right]))
+    overlapping = areas > min_area
+
+    return [(int(i), int(j)) for i, j in zip(left[overlapping], right[overlapping])]
+
+
+
+def cap_polygons(geometry):
+    """CAP polygon strings, of the 'lat,lon' pairs of the exterior ring of each polygon of a geometry"""
+    polygons = [geometry] if isinstance(geometry, Polygon) else list(geometry.geoms)
+    return [" ".join(["{},{}".format(y, x) for x, y in polygon.exterior.reverse().coords]) for polygon in polygons]
+
+
+def _simplify(geometries, tolerance, is_coverage):
+    if is_coverage:
+        # simplifies the shared edges of adjacent areas once, so that no gaps open between them
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def simplify_to_vertex_budget(geometries, max_vertices, tolerance):
+    """
+    Simplify WGS84 area geometries until they have at most `max_vertices` vertices in total.
+
+    Starts at `tolerance`, in degrees, and doubles it until the budget is met. Geometries forming a
+    valid coverage, like adjacent districts, are simplified together so that their shared edges stay
+    shared. Other geometries are simplified one by one, preserving their validity.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+
+    # coverage simplification needs shapely 2.1 and GEOS 3.12
+    is_coverage = (
+            hasattr(shapely, "coverage_simplify")
+            and len(geometries) > 1
+            and bool(shapely.coverage_is_valid(geometries))
+    )
+
+    simplified = geometries
+    for _ in range(SIMPLIFY_MAX_STEPS):
+        simplified = _simplify(geometries, tolerance, is_coverage)
+        if shapely.get_num_coordinates(simplified).sum() <= max_vertices:
+            break
+        tolerance *= 2
+
+    return list(simplified)
+
+
+def get_simplified_geojson(geojson_geometries):
+    """
+    Variants of GeoJSON area geometries fitting the CAP area vertex budget, for CAP messages, feeds
+    and maps. Geometries within budget are returned as they are.
+
+    Simplified variants are cached by the content of the geometries, so detailed boundaries are
+    simplified once, whichever alerts use them.
+    """
+    max_vertices = get_area_vertex_budget()
+    tolerance = get_area_simplify_tolerance()
+
+    geometries = [shape(geojson) for geojson in geojson_geometries]
+    if not geometries or shapely.get_num_coordinates(geometries).sum() <= max_vertices:
+        return list(geojson_geometries)
+
+    digest = hashlib.sha256(f"{max_vertices}:{tolerance}".encode())
+    for geometry in geometries:
+        digest.update(shapely.to_wkb(geometry))
+    cache_key = f"cap_simplified_areas_{digest.hexdigest()}"
+
+    simplified = cache.get(cache_key)
+    if simplified is None:
+        simplified = [mapping(geometry) for geometry in simplify_to_vertex_budget(geometries, max_vertices, tolerance)]
+        cache.set(cache_key, simplified, SIMPLIFIED_AREAS_CACHE_TIMEOUT)
+
+    return simplified
@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+import shapely
+from django.core.management.base import BaseCommand
+
+from capcomposer.capeditor.geometry import find_overlapping_geometries, geodesic_area
+
+
+def make_district_grid(rows, cols, vertices_per_side, size=0.5, origin=(30.0, -5.0)):
+    """
+    Grid of adjacent square districts, in degrees, with jagged shared edges of `vertices_per_side`
+    vertices, like predefined admin boundary areas.
+    """
+    rng = np.random.default_rng(0)
+    x0, y0 = origin
+    jitter = size / vertices_per_side / 4
+
+    # shared edge vertices, so that neighbouring districts touch without overlapping
+    xs = np.linspace(0, cols * size, cols * vertices_per_side + 1) + x0
+    ys = np.linspace(0, rows * size, rows * vertices_per_side + 1) + y0
+    horizontal = {(r, c): rng.uniform(-jitter, jitter, vertices_per_side + 1) for r in range(rows + 1) for c in
+                  range(cols)}
+    vertical = {(r, c): rng.uniform(-jitter, jitter, vertices_per_side + 1) for r in range(rows) for c in
+                range(cols + 1)}
+
+    for (r, c), offsets in horizontal.items():
+        if r in (0, rows):
+            offsets[:] = 0
+        offsets[[0, -1]] = 0
+    for (r, c), offsets in vertical.items():
+        if c in (0, cols):
+            offsets[:] = 0
+        offsets[[0, -1]] = 0
+
+    districts = []
+    n = vertices_per_side
+    for r in range(rows):
+        for c in range(cols):
+            bottom_x = xs[c * n:(c + 1) * n + 1]
+            left_y = ys[r * n:(r + 1) * n + 1]
+
+            bottom = np.column_stack([bottom_x, y0 + r * size + horizontal[(r, c)]])
+            right = np.column_stack([x0 + (c + 1) * size + vertical[(r, c + 1)], left_y])
+            top = np.column_stack([bottom_x, y0 + (r + 1) * size + horizontal[(r + 1, c)]])[::-1]
+            left = np.column_stack([x0 + c * size + vertical[(r, c)], left_y])[::-1]
+
+            ring = np.concatenate([bottom, right[1:], top[1:], left[1:]])
+            districts.append(shapely.Polygon(ring))
+
+    return districts
+
+
+def pairwise_overlaps(geometries, min_area=1000):
+    """All pairs comparison, as done before the STRtree based check"""
+    overlapping = []
+    for i in range(len(geometries)):
+        for j in range(i + 1, len(geometries)):
+            if geometries[i].intersects(geometries[j]):
+                if geodesic_area(geometries[i].intersection(geometries[j])) > min_area:
+                    overlapping.append((i, j))
+    return overlapping
+
+
+class Command(BaseCommand):
+    help = "Benchmark the alert area intersection check on a grid of adjacent detailed districts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=12)
+        parser.add_argument("--cols", type=int, default=12)
+        parser.add_argument("--vertices", type=int, default=250,
+                            help="Vertices per district side")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--skip-pairwise", action="store_true",
+                            help="Only time the STRtree based check")
+
+    def handle(self, *args, **options):
+        districts = make_district_grid(options["rows"], options["cols"], options["vertices"])
+        # one district overlapping its neighbours, for the check to have something to find
+        districts.append(shapely.affinity.translate(districts[0], xoff=0.1, yoff=0.1))
+
+        self.stdout.write(f"{len(districts)} areas, {shapely.get_num_coordinates(districts).sum()} vertices")
+
+        timings = {"strtree": (find_overlapping_geometries, [])}
+        if not options["skip_pairwise"]:
+            timings["pairwise"] = (pairwise_overlaps, [])
+
+        for name, (check, durations) in timings.items():
+            for _ in range(options["repeat"]):
+                geometries = [shapely.from_wkb(shapely.to_wkb(district)) for district in districts]
+                start = time.perf_counter()
+                overlapping = check(geometries)
+                durations.append(time.perf_counter() - start)
+
+            self.stdout.write(f"{name}: best of {options['repeat']} {min(durations) * 1000:.1f} ms, "
+                              f"{len(overlapping)} overlapping pairs")
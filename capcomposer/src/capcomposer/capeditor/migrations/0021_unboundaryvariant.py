@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_un_boundary_variants(apps, schema_editor):
+    from capcomposer.capeditor.un_boundary import update_un_boundary_variants
+    
+    CapSetting = apps.get_model("capeditor", "CapSetting")
+    UNBoundaryVariant = apps.get_model("capeditor", "UNBoundaryVariant")
+    
+    for setting in CapSetting.objects.exclude(un_country_boundary_geojson__isnull=True):
+        update_un_boundary_variants(setting, variant_model=UNBoundaryVariant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capeditor', '0020_alter_alertlanguage_setting_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UNBoundaryVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('low', 'low'), ('medium', 'medium'), ('full', 'full')], max_length=20)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('content', models.BinaryField()),
+                ('setting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='un_boundary_variants', to='capeditor.capsetting')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('setting', 'resolution'), name='unique_setting_un_boundary_resolution')],
+            },
+        ),
+        migrations.RunPython(build_un_boundary_variants, migrations.RunPython.noop),
+    ]
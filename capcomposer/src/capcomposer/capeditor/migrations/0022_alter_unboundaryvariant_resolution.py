@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+def delete_low_un_boundary_variants(apps, schema_editor):
+    UNBoundaryVariant = apps.get_model("capeditor", "UNBoundaryVariant")
+    UNBoundaryVariant.objects.filter(resolution="low").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capeditor', '0021_unboundaryvariant'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_low_un_boundary_variants, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='unboundaryvariant',
+            name='resolution',
+            field=models.CharField(choices=[('medium', 'medium'), ('full', 'full')], max_length=20),
+        ),
+    ]
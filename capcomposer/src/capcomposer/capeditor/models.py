@@ -25,8 +25,8 @@ from capcomposer.capeditor.blocks import (
     get_language_choices
 )
 from capcomposer.capeditor.constants import SEVERITY_MAPPING, URGENCY_MAPPING, CERTAINTY_MAPPING
-from .cap_settings import (CapSetting, HazardEventTypes, PredefinedAlertArea, AlertLanguage)
-from .utils import format_date_to_oid, get_event_info
+from .cap_settings import (CapSetting, HazardEventTypes, PredefinedAlertArea, AlertLanguage, UNBoundaryVariant)
+from .utils import format_date_to_oid, get_event_info_map, DEFAULT_EVENT_INFO
 
 __all__ = [
     "AbstractCapAlertPage",
@@ -34,10 +34,51 @@ __all__ = [
     "CapSetting",
     "HazardEventTypes",
     "PredefinedAlertArea",
-    "AlertLanguage"
+    "AlertLanguage",
+    "UNBoundaryVariant",
+    "get_cap_setting_for_site",
+    "get_event_infos_for_site",
 ]
 
 
+def get_cap_setting_for_site(site, request=None):
+    """
+    CAP settings of `site`, memoized on `request` when given.
+    
+    A page may belong to a different site than the one serving the request (e.g. the admin),
+    so settings are memoized per site, rather than through CapSetting.for_request.
+    """
+    if request is None:
+        return CapSetting.for_site(site)
+    
+    cap_settings_by_site = getattr(request, "_cap_settings_by_site", None)
+    if cap_settings_by_site is None:
+        cap_settings_by_site = {}
+        setattr(request, "_cap_settings_by_site", cap_settings_by_site)
+    
+    if site.pk not in cap_settings_by_site:
+        cap_settings_by_site[site.pk] = CapSetting.for_site(site)
+    
+    return cap_settings_by_site[site.pk]
+
+
+def get_event_infos_for_site(site, cap_setting=None, request=None):
+    """Event infos of the CAP settings of `site`, memoized on `request` when given"""
+    if request is None:
+        return get_event_info_map(cap_setting or CapSetting.for_site(site))
+    
+    event_infos_by_site = getattr(request, "_cap_event_infos_by_site", None)
+    if event_infos_by_site is None:
+        event_infos_by_site = {}
+        setattr(request, "_cap_event_infos_by_site", event_infos_by_site)
+    
+    if site.pk not in event_infos_by_site:
+        cap_setting = cap_setting or get_cap_setting_for_site(site, request=request)
+        event_infos_by_site[site.pk] = get_event_info_map(cap_setting)
+    
+    return event_infos_by_site[site.pk]
+
+
 class CapAlertPageForm(WagtailAdminPageForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -157,7 +198,7 @@ class CapAlertPageForm(WagtailAdminPageForm):
 class AbstractCapAlertPage(Page):
     base_form_class = CapAlertPageForm
     
-    exclude_fields_in_copy = ["guid"]
+    exclude_fields_in_copy = ["guid", "cap_identifier"]
     
     STATUS_CHOICES = (
         ("Draft", _("Draft - A preliminary template or draft, not actionable in its current form")),
@@ -235,6 +276,10 @@ class AbstractCapAlertPage(Page):
     ], use_json_field=True, blank=True,
         null=True, verbose_name=_("Incidents"))
     
+    # <identifier> as computed when the alert was published, so that it is not derived again on every access
+    cap_identifier = models.CharField(max_length=255, blank=True, null=True, editable=False,
+                                      verbose_name=_("Identifier"))
+    
     class Meta:
         abstract = True
     
@@ -258,10 +303,11 @@ class AbstractCapAlertPage(Page):
     
     @cached_property
     def feature_collection(self):
+        # displayed on the alert page, with the original area geometries
         fc = {"type": "FeatureCollection", "features": []}
         for info in self.info:
-            if info.value.features:
-                for feature in info.value.features:
+            if info.value.display_features:
+                for feature in info.value.display_features:
                     feature.get("properties", {}).update({"info-id": info.id})
                     fc["features"].append(feature)
         return fc
@@ -296,10 +342,27 @@ class AbstractCapAlertPage(Page):
     def xml_link(self):
         return None
     
+    @cached_property
+    def cap_site(self):
+        return self.get_site()
+    
+    def get_cap_setting(self, request=None):
+        """CAP settings of the alert's site, resolved once per page instance"""
+        cap_setting = getattr(self, "_cap_setting", None)
+        if cap_setting is None:
+            cap_setting = get_cap_setting_for_site(self.cap_site, request=request)
+            self._cap_setting = cap_setting
+        return cap_setting
+    
     @property
     def identifier(self):
-        site = self.get_site()
-        cap_setting = CapSetting.for_site(site)
+        if self.cap_identifier:
+            return self.cap_identifier
+        return self.get_identifier()
+    
+    def get_identifier(self, cap_setting=None):
+        if cap_setting is None:
+            cap_setting = self.get_cap_setting()
         
         if cap_setting.wmo_oid:
             return format_date_to_oid(cap_setting.wmo_oid, self.sent)
@@ -308,7 +371,46 @@ class AbstractCapAlertPage(Page):
     
     @cached_property
     def infos(self):
-        site = self.get_site()
+        return self.get_infos()
+    
+    def get_reference_ids(self):
+        """Ids of the referenced alerts, read from the references data without loading the pages"""
+        reference_ids = []
+        
+        for reference in (self.references.raw_data if self.references else []):
+            ref_alert_id = (reference.get("value") or {}).get("ref_alert")
+            if ref_alert_id and ref_alert_id not in reference_ids:
+                reference_ids.append(ref_alert_id)
+        
+        return reference_ids
+    
+    def get_reference_alerts(self):
+        """Referenced alerts, loaded in a single query, in the order they are referenced"""
+        reference_ids = self.get_reference_ids()
+        if not reference_ids:
+            return []
+        
+        alerts_by_id = self.__class__.objects.in_bulk(reference_ids)
+        
+        return [alerts_by_id[ref_id] for ref_id in reference_ids if ref_id in alerts_by_id]
+    
+    def get_infos(self, site=None, cap_setting=None, event_infos=None, request=None):
+        """
+        Display data for each info of the alert.
+        
+        Listings can resolve the site, its CAP settings and event infos once and pass them in,
+        instead of each alert looking them up again. Given a request, they are resolved once per
+        site for the whole request.
+        """
+        if site is None:
+            site = self.cap_site
+        if cap_setting is None:
+            cap_setting = get_cap_setting_for_site(site, request=request)
+        if event_infos is None:
+            event_infos = get_event_infos_for_site(site, cap_setting=cap_setting, request=request)
+        
+        identifier = self.cap_identifier or self.get_identifier(cap_setting)
+        
         alert_infos = []
         for info in self.info:
             start_time = info.value.get("effective") or self.sent
@@ -336,7 +438,7 @@ class AbstractCapAlertPage(Page):
             expires = info.value.get('expires')
             url = self.url
             
-            event_info = get_event_info(event, site)
+            event_info = event_infos.get(event) or DEFAULT_EVENT_INFO
             event_icon = event_info.get("icon")
             category = event_info.get('category')
             if isinstance(category, list):
@@ -363,8 +465,8 @@ class AbstractCapAlertPage(Page):
                 "expires": expires,
                 "expired": expired,
                 "properties": {
-                    "id": self.identifier,
-                    "identifier": self.identifier,
+                    "id": identifier,
+                    "identifier": identifier,
                     "event": event,
                     "event_with_area": event_with_area,
                     "event_type": info.value.get('event'),
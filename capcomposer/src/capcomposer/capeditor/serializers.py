@@ -6,7 +6,7 @@ from rest_framework import serializers
 from wagtail.api.v2.utils import get_full_url
 
 from capcomposer.capeditor.constants import CAP_MESSAGE_ORDER_SEQUENCE, OET_VERSION_NAME
-from capcomposer.capeditor.utils import order_dict_by_keys, get_event_info
+from capcomposer.capeditor.utils import order_dict_by_keys, get_event_info_map, DEFAULT_EVENT_INFO
 
 
 def parse_tz(date_str):
@@ -25,6 +25,12 @@ def parse_tz(date_str):
     return date_str
 
 
+def format_alert_reference(alert_page):
+    """CAP <references> entry for an alert: sender, identifier and sent time"""
+    sent = parse_tz(alert_page.sent.isoformat())
+    return "{},{},{}".format(alert_page.sender, alert_page.identifier, sent)
+
+
 class AlertSerializer(serializers.ModelSerializer):
     addresses = serializers.SerializerMethodField()
     references = serializers.SerializerMethodField()
@@ -53,15 +59,26 @@ class AlertSerializer(serializers.ModelSerializer):
     def get_identifier(self, obj):
         return obj.identifier
     
+    def get_event_infos(self):
+        """Event infos of the request's CAP settings, loaded once per serializer instead of once per info"""
+        if not hasattr(self, "_event_infos"):
+            from capcomposer.capeditor.cap_settings import CapSetting
+            
+            request = self.context.get("request")
+            self._event_infos = get_event_info_map(CapSetting.for_request(request)) if request else {}
+        
+        return self._event_infos
+    
     def get_info(self, obj):
         request = self.context.get("request")
+        event_infos = self.get_event_infos()
         info_values = []
         
         for info in obj.info:
             info_obj = info.block.get_api_representation(info.value)
             
             event = info_obj.get("event")
-            event_info = get_event_info(event, request=request)
+            event_info = event_infos.get(event) or dict(DEFAULT_EVENT_INFO)
             
             category = event_info.get("category")
             info_obj["category"] = category
@@ -148,10 +165,8 @@ class AlertSerializer(serializers.ModelSerializer):
     
     @staticmethod
     def get_references(obj):
-        reference_values = []
-        for reference in obj.references:
-            if reference.value.ref_alert_identifier:
-                reference_values.append(reference.value.ref_alert_identifier)
+        # referenced alerts are loaded in one query, instead of one page load per reference
+        reference_values = [format_alert_reference(alert_page) for alert_page in obj.get_reference_alerts()]
         if reference_values:
             return " ".join(reference_values)
         return None
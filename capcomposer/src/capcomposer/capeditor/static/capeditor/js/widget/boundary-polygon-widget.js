@@ -6,6 +6,7 @@ class BoundaryPolygonWidget {
 
         this.boundaryInfoUrl = this.geomInput.data("boundaryinfourl")
         this.UNGeojsonBoundaryUrl = this.geomInput.data("ungeojsonurl")
+        this.UNGeojsonBoundaryDisplayUrl = this.geomInput.data("ungeojsondisplayurl")
 
         this.init()
     }
@@ -81,15 +82,16 @@ class BoundaryPolygonWidget {
     }
 
     initUNBoundary() {
-        if (this.UNGeojsonBoundaryUrl) {
-            fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+        // the outline is drawn from a simplified boundary. The exact one is only loaded to check drawn areas
+        const displayUrl = this.UNGeojsonBoundaryDisplayUrl || this.UNGeojsonBoundaryUrl
+        if (displayUrl) {
+            fetch(displayUrl).then(res => res.json()).then(geojson => {
                 // ensure not empty geojson
                 if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
                     return
                 }
 
-                this.UNGeojsonBoundaryGeojson = geojson
-
+                this.UNGeojsonBoundaryDisplayGeojson = geojson
                 if (this.map) {
                     this.addUNBoundaryLayer()
                 }
@@ -97,6 +99,22 @@ class BoundaryPolygonWidget {
         }
     }
 
+    loadUNBoundary() {
+        if (!this.UNGeojsonBoundaryPromise) {
+            this.UNGeojsonBoundaryPromise = fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+                // ensure not empty geojson
+                if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
+                    return null
+                }
+
+                this.UNGeojsonBoundaryGeojson = geojson
+                return geojson
+            })
+        }
+
+        return this.UNGeojsonBoundaryPromise
+    }
+
 
     setState(newState) {
         this.geomInput.val(newState);
@@ -324,7 +342,7 @@ class BoundaryPolygonWidget {
 
     addUNBoundaryLayer() {
         this.map.addSource("un-boundary", {
-            type: 'geojson', data: this.UNGeojsonBoundaryGeojson
+            type: 'geojson', data: this.UNGeojsonBoundaryDisplayGeojson
         })
 
         this.map.addLayer({
@@ -428,6 +446,15 @@ class BoundaryPolygonWidget {
     }
 
     checkUNBoundaryIssues(featureGeom) {
+        if (!this.UNGeojsonBoundaryGeojson && this.UNGeojsonBoundaryUrl && featureGeom) {
+            this.loadUNBoundary().then(geojson => {
+                if (geojson) {
+                    this.checkUNBoundaryIssues(featureGeom)
+                }
+            })
+            return
+        }
+
         if (this.UNGeojsonBoundaryGeojson && featureGeom) {
             const selectedFeature = turf.feature(featureGeom)
             const UNBoundaryFeature = turf.feature(this.UNGeojsonBoundaryGeojson)
@@ -10,6 +10,7 @@ class CircleWidget {
 
         this.boundaryInfoUrl = this.circleInput.data("boundaryinfourl")
         this.UNGeojsonBoundaryUrl = this.circleInput.data("ungeojsonurl")
+        this.UNGeojsonBoundaryDisplayUrl = this.circleInput.data("ungeojsondisplayurl")
 
 
         const id_parts = options.id.split("-area")
@@ -332,14 +333,16 @@ class CircleWidget {
     }
 
     initUNBoundary() {
-        if (this.UNGeojsonBoundaryUrl) {
-            fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+        // the outline is drawn from a simplified boundary. The exact one is only loaded to check drawn areas
+        const displayUrl = this.UNGeojsonBoundaryDisplayUrl || this.UNGeojsonBoundaryUrl
+        if (displayUrl) {
+            fetch(displayUrl).then(res => res.json()).then(geojson => {
                 // ensure not empty geojson
                 if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
                     return
                 }
 
-                this.UNGeojsonBoundaryGeojson = geojson
+                this.UNGeojsonBoundaryDisplayGeojson = geojson
                 if (this.map) {
                     this.addUNBoundaryLayer()
                 }
@@ -347,9 +350,25 @@ class CircleWidget {
         }
     }
 
+    loadUNBoundary() {
+        if (!this.UNGeojsonBoundaryPromise) {
+            this.UNGeojsonBoundaryPromise = fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+                // ensure not empty geojson
+                if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
+                    return null
+                }
+
+                this.UNGeojsonBoundaryGeojson = geojson
+                return geojson
+            })
+        }
+
+        return this.UNGeojsonBoundaryPromise
+    }
+
     addUNBoundaryLayer() {
         this.map.addSource("un-boundary", {
-            type: 'geojson', data: this.UNGeojsonBoundaryGeojson
+            type: 'geojson', data: this.UNGeojsonBoundaryDisplayGeojson
         })
 
         this.map.addLayer({
@@ -413,6 +432,15 @@ class CircleWidget {
     }
 
     checkUNBoundaryIssues(featureGeom) {
+        if (!this.UNGeojsonBoundaryGeojson && this.UNGeojsonBoundaryUrl && featureGeom) {
+            this.loadUNBoundary().then(geojson => {
+                if (geojson) {
+                    this.checkUNBoundaryIssues(featureGeom)
+                }
+            })
+            return
+        }
+
         if (this.UNGeojsonBoundaryGeojson && featureGeom) {
             const drawnFeature = turf.feature(featureGeom)
             const UNBoundaryFeature = turf.feature(this.UNGeojsonBoundaryGeojson)
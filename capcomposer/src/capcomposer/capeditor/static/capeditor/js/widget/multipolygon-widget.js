@@ -82,7 +82,9 @@ class MultiPolygonWidget {
 
         this.boundaryInfoUrl = this.geomInput.data("boundaryinfourl")
         this.UNGeojsonBoundaryUrl = this.geomInput.data("ungeojsonurl")
+        this.UNGeojsonBoundaryDisplayUrl = this.geomInput.data("ungeojsondisplayurl")
         this.convertAreaFileUrl = this.geomInput.data("convertareafileurl")
+        this.areaTilesUrl = this.geomInput.data("areatilesurl")
 
         this.createMap().then((map) => {
             this.map = map;
@@ -99,6 +101,8 @@ class MultiPolygonWidget {
 
             this.initDraw();
 
+            this.addAreaTilesLayer()
+
             this.initFromState()
 
             this.initUNBoundary()
@@ -220,6 +224,31 @@ class MultiPolygonWidget {
         this.map.on("draw.update", this.updateArea);
     }
 
+    addAreaTilesLayer() {
+        if (!this.areaTilesUrl) {
+            return
+        }
+
+        // predefined areas of the site, loaded tile by tile as the map moves
+        this.map.addSource("area-tiles", {
+            type: "vector", tiles: [window.location.origin + this.areaTilesUrl],
+        })
+
+        // below the drawn polygons
+        const drawLayer = this.map.getStyle().layers.find(layer => layer.id.startsWith("gl-draw"))
+        const beforeId = drawLayer ? drawLayer.id : undefined
+
+        this.map.addLayer({
+            id: "predefined-areas-line",
+            type: "line",
+            source: "area-tiles",
+            "source-layer": "predefined_areas",
+            paint: {
+                "line-color": "#3366ff", "line-width": 1, "line-dasharray": [2, 2],
+            }
+        }, beforeId)
+    }
+
     getDrawFeatures() {
         let combinedFeatures
 
@@ -300,14 +329,16 @@ class MultiPolygonWidget {
     }
 
     initUNBoundary() {
-        if (this.UNGeojsonBoundaryUrl) {
-            fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+        // the outline is drawn from a simplified boundary. The exact one is only loaded to check drawn areas
+        const displayUrl = this.UNGeojsonBoundaryDisplayUrl || this.UNGeojsonBoundaryUrl
+        if (displayUrl) {
+            fetch(displayUrl).then(res => res.json()).then(geojson => {
                 // ensure not empty geojson
                 if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
                     return
                 }
 
-                this.UNGeojsonBoundaryGeojson = geojson
+                this.UNGeojsonBoundaryDisplayGeojson = geojson
                 if (this.map) {
                     this.addUNBoundaryLayer()
                 }
@@ -315,9 +346,25 @@ class MultiPolygonWidget {
         }
     }
 
+    loadUNBoundary() {
+        if (!this.UNGeojsonBoundaryPromise) {
+            this.UNGeojsonBoundaryPromise = fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+                // ensure not empty geojson
+                if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
+                    return null
+                }
+
+                this.UNGeojsonBoundaryGeojson = geojson
+                return geojson
+            })
+        }
+
+        return this.UNGeojsonBoundaryPromise
+    }
+
     addUNBoundaryLayer() {
         this.map.addSource("un-boundary", {
-            type: 'geojson', data: this.UNGeojsonBoundaryGeojson
+            type: 'geojson', data: this.UNGeojsonBoundaryDisplayGeojson
         })
 
         this.map.addLayer({
@@ -352,6 +399,15 @@ class MultiPolygonWidget {
     }
 
     checkUNBoundaryIssues(featureGeom) {
+        if (!this.UNGeojsonBoundaryGeojson && this.UNGeojsonBoundaryUrl && featureGeom) {
+            this.loadUNBoundary().then(geojson => {
+                if (geojson) {
+                    this.checkUNBoundaryIssues(featureGeom)
+                }
+            })
+            return
+        }
+
         if (this.UNGeojsonBoundaryGeojson && featureGeom) {
             const drawnFeature = turf.feature(featureGeom)
             const UNBoundaryFeature = turf.feature(this.UNGeojsonBoundaryGeojson)
@@ -540,6 +596,32 @@ class MultiPolygonWidget {
         }
     }
 
+    async _pollAreaFileConversion(statusUrl) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+
+            if (!response.ok || data.status === 'error') {
+                throw new Error(data.error || 'Failed to convert shapefile');
+            }
+
+            if (data.status === 'done') {
+                return data;
+            }
+
+            this._setLoadingProgress(data.progress);
+        }
+    }
+
+    _setLoadingProgress(progress) {
+        const label = this.map.getContainer().querySelector('.file-upload-loading span');
+        if (label && progress) {
+            label.textContent = `Converting shapefile… ${Math.round(progress * 100)}%`;
+        }
+    }
+
     async _uploadShapefile(file) {
         if (!this.convertAreaFileUrl) {
             this.showWarning('Shapefile conversion endpoint is not configured');
@@ -558,12 +640,17 @@ class MultiPolygonWidget {
                 body: formData,
             });
 
-            const data = await response.json();
+            let data = await response.json();
 
             if (!response.ok) {
                 throw new Error(data.error || 'Failed to convert shapefile');
             }
 
+            // large files are converted in the background
+            if (response.status === 202) {
+                data = await this._pollAreaFileConversion(data.status_url);
+            }
+
             this._loadGeometry(data.geometry);
         } catch (err) {
             this.showWarning(err.message);
@@ -72,6 +72,7 @@ class PolygonWidget {
 
         this.boundaryInfoUrl = this.geomInput.data("boundaryinfourl")
         this.UNGeojsonBoundaryUrl = this.geomInput.data("ungeojsonurl")
+        this.UNGeojsonBoundaryDisplayUrl = this.geomInput.data("ungeojsondisplayurl")
 
         const id_parts = options.id.split("-area")
         const info_id = id_parts[0]
@@ -448,14 +449,16 @@ class PolygonWidget {
     }
 
     initUNBoundary() {
-        if (this.UNGeojsonBoundaryUrl) {
-            fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+        // the outline is drawn from a simplified boundary. The exact one is only loaded to check drawn areas
+        const displayUrl = this.UNGeojsonBoundaryDisplayUrl || this.UNGeojsonBoundaryUrl
+        if (displayUrl) {
+            fetch(displayUrl).then(res => res.json()).then(geojson => {
                 // ensure not empty geojson
                 if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
                     return
                 }
 
-                this.UNGeojsonBoundaryGeojson = geojson
+                this.UNGeojsonBoundaryDisplayGeojson = geojson
                 if (this.map) {
                     this.addUNBoundaryLayer()
                 }
@@ -463,9 +466,25 @@ class PolygonWidget {
         }
     }
 
+    loadUNBoundary() {
+        if (!this.UNGeojsonBoundaryPromise) {
+            this.UNGeojsonBoundaryPromise = fetch(this.UNGeojsonBoundaryUrl).then(res => res.json()).then(geojson => {
+                // ensure not empty geojson
+                if (geojson && Object.keys(geojson).length === 0 && geojson.constructor === Object) {
+                    return null
+                }
+
+                this.UNGeojsonBoundaryGeojson = geojson
+                return geojson
+            })
+        }
+
+        return this.UNGeojsonBoundaryPromise
+    }
+
     addUNBoundaryLayer() {
         this.map.addSource("un-boundary", {
-            type: 'geojson', data: this.UNGeojsonBoundaryGeojson
+            type: 'geojson', data: this.UNGeojsonBoundaryDisplayGeojson
         })
 
         this.map.addLayer({
@@ -500,6 +519,15 @@ class PolygonWidget {
     }
 
     checkUNBoundaryIssues(featureGeom) {
+        if (!this.UNGeojsonBoundaryGeojson && this.UNGeojsonBoundaryUrl && featureGeom) {
+            this.loadUNBoundary().then(geojson => {
+                if (geojson) {
+                    this.checkUNBoundaryIssues(featureGeom)
+                }
+            })
+            return
+        }
+
         if (this.UNGeojsonBoundaryGeojson && featureGeom) {
             const drawnFeature = turf.feature(featureGeom)
             const UNBoundaryFeature = turf.feature(this.UNGeojsonBoundaryGeojson)
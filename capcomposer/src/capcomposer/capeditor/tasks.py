@@ -0,0 +1,14 @@
+import logging
+
+from capcomposer.utils import get_celery_app
+from .area_files import convert_stored_area_file
+
+logger = logging.getLogger(__name__)
+
+app = get_celery_app()
+
+
+@app.task(bind=True)
+def handle_convert_area_file(self, token, name, user_id, dissolve=False, simplify=None):
+    logger.info(f"Converting area file '{name}'...")
+    convert_stored_area_file(token, name, user_id, dissolve=dissolve, simplify=simplify)
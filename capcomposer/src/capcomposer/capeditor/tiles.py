@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.db import connection
+
+# tiles are dropped when the predefined areas of their site change
+AREA_TILES_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+AREA_TILES_MAX_AGE = 60
+
+AREA_TILES_MAX_ZOOM = 22
+
+# tile coordinates, and margin around tiles for lines and fills not to be cut at their edges
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+AREA_TILE_SQL = """
+WITH
+bounds AS (
+    SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom,
+           ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326) AS geom_4326
+),
+predefined_areas AS (
+    SELECT ST_AsMVTGeom(ST_Transform(a.geom, 3857), bounds.geom, {extent}, {buffer}, true) AS geom, a.id, a.name
+    FROM {area_table} a
+    JOIN {setting_table} s ON s.id = a.setting_id, bounds
+    WHERE s.site_id = %(site_id)s AND a.geom && bounds.geom_4326
+)
+SELECT COALESCE((SELECT ST_AsMVT(predefined_areas, 'predefined_areas', {extent}) FROM predefined_areas), ''::bytea)
+"""
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= AREA_TILES_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def get_area_tiles_version(site_id):
+    """Version of the area tiles of a site, bumped when its predefined areas change"""
+    key = f"cap_area_tiles_version_{site_id}"
+    version = cache.get(key)
+
+    if version is None:
+        version = 1
+        cache.set(key, version, None)
+
+    return version
+
+
+def bump_area_tiles_version(site_id):
+    key = f"cap_area_tiles_version_{site_id}"
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # key does not exist yet
+        cache.set(key, 2, None)
+        return 2
+
+
+def _render_area_tile(site_id, z, x, y):
+    from .cap_settings import CapSetting, PredefinedAlertArea
+
+    sql = AREA_TILE_SQL.format(
+        area_table=connection.ops.quote_name(PredefinedAlertArea._meta.db_table),
+        setting_table=connection.ops.quote_name(CapSetting._meta.db_table),
+        extent=TILE_EXTENT,
+        buffer=TILE_BUFFER,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {"site_id": site_id, "z": z, "x": x, "y": y})
+        return bytes(cursor.fetchone()[0])
+
+
+def get_area_tile(site_id, z, x, y):
+    """
+    Mapbox Vector Tile of the predefined areas of a site, in a 'predefined_areas' layer.
+
+    Tiles are rendered by PostGIS, and cached until the areas of the site change.
+    Empty tiles are cached too, as most tiles of the world have no areas.
+    """
+    key = f"cap_area_tile_{site_id}_v{get_area_tiles_version(site_id)}_{z}_{x}_{y}"
+    tile = cache.get(key)
+
+    if tile is None:
+        tile = _render_area_tile(site_id, z, x, y)
+        cache.set(key, tile, AREA_TILES_CACHE_TIMEOUT)
+
+    return tile
@@ -0,0 +1,123 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# segments sent to a provider supporting batches per call
+TRANSLATION_BATCH_SIZE = 20
+
+
+def get_translation_cache_timeout():
+    return getattr(settings, "CAP_TRANSLATION_CACHE_TIMEOUT", 60 * 60 * 24 * 30)
+
+
+def get_translation_workers():
+    return getattr(settings, "CAP_TRANSLATION_WORKERS", 4)
+
+
+class TranslationServiceError(Exception):
+    pass
+
+
+class StubTranslatorService:
+    """
+    Local translator returning the text prefixed with the target language, without calling any
+    provider. Set PO_TRANSLATOR_SERVICE to it for tests and development.
+    """
+
+    def translate_string(self, text, target_language, source_language="auto"):
+        return f"[{target_language}] {text}"
+
+    def translate_batch(self, texts, target_language, source_language="auto"):
+        return [self.translate_string(text, target_language, source_language) for text in texts]
+
+
+def get_translator_service():
+    try:
+        from django_deep_translator.utils import get_translator
+        return get_translator()
+    except Exception as e:
+        raise TranslationServiceError(e)
+
+
+def get_translation_cache_key(text, target_language, source_language):
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"cap_translation_{source_language}_{target_language}_{digest}"
+
+
+def _translate_batch(segments, target_language, source_language):
+    # a translator per batch, as the provider services keep per call state
+    translator = get_translator_service()
+
+    if hasattr(translator, "translate_batch"):
+        try:
+            return dict(zip(segments, translator.translate_batch(segments, target_language, source_language)))
+        except Exception as e:
+            logger.warning(f"Could not translate a batch of {len(segments)} segments to {target_language}: {e}")
+            return {}
+
+    translated = {}
+    for segment in segments:
+        try:
+            translated[segment] = translator.translate_string(segment, target_language, source_language)
+        except Exception as e:
+            logger.warning(f"Could not translate a segment to {target_language}: {e}")
+    return translated
+
+
+def translate_segments(segments, target_language, source_language="auto"):
+    """
+    Translations of text segments, by segment. Segments that could not be translated are left out.
+
+    Duplicate segments are translated once. Translations are cached by language pair and text hash,
+    so repeated texts, like standard instructions, are not sent to the provider again. The others
+    are sent in concurrent batches, one segment per call unless the provider supports batches.
+    """
+    segments = list(dict.fromkeys(segments))
+    if not segments:
+        return {}
+
+    keys = {get_translation_cache_key(segment, target_language, source_language): segment for segment in segments}
+    cached = cache.get_many(list(keys.keys()))
+
+    translated = {keys[key]: value for key, value in cached.items()}
+    missing = [segment for segment in segments if segment not in translated]
+    if not missing:
+        return translated
+
+    translator = get_translator_service()
+    batch_size = TRANSLATION_BATCH_SIZE if hasattr(translator, "translate_batch") else 1
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+
+    new = {}
+    workers = min(get_translation_workers(), len(batches))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_translated in executor.map(
+                    lambda batch: _translate_batch(batch, target_language, source_language), batches):
+                new.update(batch_translated)
+    else:
+        for batch in batches:
+            new.update(_translate_batch(batch, target_language, source_language))
+
+    new = {segment: value for segment, value in new.items() if value and isinstance(value, str)}
+    if new:
+        cache.set_many(
+            {get_translation_cache_key(segment, target_language, source_language): value
+             for segment, value in new.items()},
+            get_translation_cache_timeout(),
+        )
+
+    translated.update(new)
+    return translated
+
+
+def translate_texts(texts, target_language, source_language="auto"):
+    """Translate the string values of the `texts` dict, keeping the values that can not be translated"""
+    segments = [text for text in texts.values() if text and isinstance(text, str) and text.strip()]
+    translated = translate_segments(segments, target_language, source_language)
+    return {key: translated.get(text, text) if isinstance(text, str) else text for key, text in texts.items()}
@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import json
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
+# simplification tolerance of each UN boundary variant, in degrees. The full variant is the boundary as uploaded
+UN_BOUNDARY_RESOLUTIONS = {
+    "medium": 0.001,
+    "full": None,
+}
+
+# simplified variants are for display only. Snapping and containment checks need the boundary as is
+DEFAULT_UN_BOUNDARY_RESOLUTION = "full"
+
+# variant the map widgets draw the boundary outline from
+UN_BOUNDARY_DISPLAY_RESOLUTION = "medium"
+
+# decimals kept in the coordinates of simplified variants, ~10 cm
+UN_BOUNDARY_COORDINATE_PRECISION = 6
+
+
+def _simplify_geometry(geojson, tolerance):
+    geometry = shapely.simplify(shape(geojson), tolerance, preserve_topology=True)
+    geometry = shapely.transform(geometry, lambda coords: np.round(coords, UN_BOUNDARY_COORDINATE_PRECISION))
+    return mapping(geometry)
+
+
+def simplify_geojson(data, tolerance):
+    """Simplify the geometries of a GeoJSON geometry, Feature or FeatureCollection"""
+    geojson_type = data.get("type")
+
+    if geojson_type == "FeatureCollection":
+        return {**data, "features": [simplify_geojson(feature, tolerance) for feature in data.get("features") or []]}
+
+    if geojson_type == "Feature":
+        geometry = data.get("geometry")
+        return {**data, "geometry": _simplify_geometry(geometry, tolerance) if geometry else geometry}
+
+    return _simplify_geometry(data, tolerance)
+
+
+def _encode_geojson(data):
+    return json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def get_content_hash(content):
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def build_un_boundary_variants(data):
+    """
+    Pre-gzipped GeoJSON of each resolution of a UN boundary, as (resolution, content_hash, content) tuples.
+
+    The hash is the one of the uncompressed GeoJSON, so it only changes with the boundary.
+    """
+    variants = []
+    for resolution, tolerance in UN_BOUNDARY_RESOLUTIONS.items():
+        content = _encode_geojson(simplify_geojson(data, tolerance) if tolerance else data)
+        variants.append((resolution, get_content_hash(content), gzip.compress(content, mtime=0)))
+
+    return variants
+
+
+def update_un_boundary_variants(setting, variant_model=None):
+    """
+    Rebuild the UN boundary variants of CAP settings, when their boundary changed.
+
+    `variant_model` is the UNBoundaryVariant model, to be given the historical one from migrations.
+    """
+    if variant_model is None:
+        from .cap_settings import UNBoundaryVariant
+        variant_model = UNBoundaryVariant
+
+    existing = variant_model.objects.filter(setting_id=setting.pk)
+
+    data = setting.un_country_boundary_geojson
+    if isinstance(data, str):
+        data = json.loads(data)
+
+    if not data:
+        existing.delete()
+        return
+
+    # the full variant is the boundary as is, so an unchanged boundary is found without simplifying it
+    full_hash = get_content_hash(_encode_geojson(data))
+    current = dict(existing.values_list("resolution", "content_hash"))
+    if current.get("full") == full_hash and set(current) == set(UN_BOUNDARY_RESOLUTIONS):
+        return
+
+    variants = build_un_boundary_variants(data)
+
+    existing.delete()
+    variant_model.objects.bulk_create([
+        variant_model(setting_id=setting.pk, resolution=resolution, content_hash=content_hash, content=content)
+        for resolution, content_hash, content in variants
+    ])
@@ -20,6 +20,24 @@ def format_date_to_oid(oid_prefix, date):
     return f"urn:oid:{oid_prefix}.{oid_date}"
 
 
+DEFAULT_EVENT_INFO = {"icon": "alert", "category": "Met"}
+
+
+def _get_hazard_event_info(hazard):
+    event_info = {
+        "icon": hazard.icon,
+        "category": hazard.category,
+        "in_wmo_list": hazard.is_in_wmo_event_types_list,
+    }
+    if hazard.event_code:
+        event_info.update({
+            "oet": get_oasis_event_term(hazard.event_code),
+            "event_name": hazard.event,
+        })
+    
+    return event_info
+
+
 def get_event_info(event, site=None, request=None, language=None):
     from capcomposer.capeditor.cap_settings import CapSetting
     
@@ -35,25 +53,31 @@ def get_event_info(event, site=None, request=None, language=None):
             hazard_event_types = cap_setting.hazard_event_types.all()
             if hazard_event_types:
                 for hazard in hazard_event_types:
-                    event_name = hazard.event
-                    using_wmo_list = hazard.is_in_wmo_event_types_list
-                    if event_name == event and hazard.icon:
-                        event_info = {
-                            "icon": hazard.icon,
-                            "category": hazard.category,
-                            "in_wmo_list": using_wmo_list,
-                        }
-                        if hazard.event_code:
-                            event_info.update({
-                                "oet": get_oasis_event_term(hazard.event_code),
-                                "event_name": hazard.event,
-                            })
-                        
-                        return event_info
+                    if hazard.event == event and hazard.icon:
+                        return _get_hazard_event_info(hazard)
+    except Exception:
+        pass
+    
+    return dict(DEFAULT_EVENT_INFO)
+
+
+def get_event_info_map(cap_setting):
+    """
+    Event info of all the hazard event types of `cap_setting`, keyed by event name.
+    
+    Loads the hazard event types once, for looking up the info of many events. Events missing
+    from the map should fall back to DEFAULT_EVENT_INFO, as in get_event_info.
+    """
+    event_infos = {}
+    
+    try:
+        for hazard in cap_setting.hazard_event_types.all():
+            if hazard.icon and hazard.event not in event_infos:
+                event_infos[hazard.event] = _get_hazard_event_info(hazard)
     except Exception:
         pass
     
-    return {"icon": "alert", "category": "Met"}
+    return event_infos
 
 
 def get_oasis_event_term(event_code):
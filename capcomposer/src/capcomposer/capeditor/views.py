@@ -1,14 +1,34 @@
+import gzip
 import json
 import os
 import tempfile
+import uuid
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.utils.cache import add_never_cache_headers, patch_cache_control, patch_vary_headers
 from django.views.decorators.http import require_POST
 from wagtail import hooks
+from wagtail.models import Site
 
 from capcomposer.capeditor.forms.capimporter import CAPLoadForm, CAPImportForm
-from .models import CapSetting
+from .area_files import (
+    AreaFileError,
+    check_area_file,
+    get_area_file_async_size,
+    get_area_file_status,
+    read_area_file,
+    save_area_file,
+    set_area_file_status,
+)
+from .models import CapSetting, UNBoundaryVariant
+from .tiles import AREA_TILES_MAX_AGE, get_area_tile, is_valid_tile
+from .translation import TranslationServiceError, translate_texts
+from .un_boundary import DEFAULT_UN_BOUNDARY_RESOLUTION, UN_BOUNDARY_RESOLUTIONS
+
+# hashed UN boundary URLs change with the boundary, so they can be kept for a year
+UN_BOUNDARY_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def load_cap_alert(request):
@@ -65,16 +85,98 @@ def import_cap_alert(request):
 
 
 def get_un_boundary_geojson(request):
+    """
+    Redirect to the pre-gzipped UN boundary of the site, at the `resolution` query parameter.
+    
+    The boundary URL includes the hash of its content, so browsers keep it until the boundary
+    changes, and only this small redirect is fetched on each editor load.
+    """
+    resolution = request.GET.get('resolution', DEFAULT_UN_BOUNDARY_RESOLUTION)
+    if resolution not in UN_BOUNDARY_RESOLUTIONS:
+        return JsonResponse({'error': 'Invalid resolution'}, status=400)
+    
     cap_settings = CapSetting.for_request(request)
-    un_country_boundary_geojson = cap_settings.un_country_boundary_geojson
-    if not un_country_boundary_geojson:
+    variant = UNBoundaryVariant.for_setting(cap_settings, resolution)
+    if not variant:
         return JsonResponse({})
     
-    return JsonResponse(un_country_boundary_geojson)
+    response = redirect('un_boundary_geojson_variant', resolution=resolution, content_hash=variant.content_hash)
+    add_never_cache_headers(response)
+    return response
+
+
+def get_un_boundary_geojson_variant(request, resolution, content_hash):
+    cap_settings = CapSetting.for_request(request)
+    variant = UNBoundaryVariant.objects.filter(setting=cap_settings, resolution=resolution,
+                                               content_hash=content_hash).first()
+    if not variant:
+        raise Http404
+    
+    content = bytes(variant.content)
+    
+    response = HttpResponse(content_type='application/json')
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.content = content
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response.content = gzip.decompress(content)
+    
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, private=True, max_age=UN_BOUNDARY_MAX_AGE, immutable=True)
+    return response
+
+
+def area_tile(request, z, x, y):
+    """Vector tile of the predefined areas of the site, for the editor maps"""
+    if not is_valid_tile(z, x, y):
+        raise Http404
+    
+    site = Site.find_for_request(request)
+    if not site:
+        raise Http404
+    
+    tile = get_area_tile(site.pk, z, x, y)
+    
+    response = HttpResponse(tile, content_type="application/vnd.mapbox-vector-tile", status=200 if tile else 204)
+    patch_cache_control(response, private=True, max_age=AREA_TILES_MAX_AGE)
+    return response
+
+
+def _get_area_file_options(params):
+    dissolve = params.get('dissolve', '').lower() in ('1', 'true', 'on')
+    
+    simplify = params.get('simplify')
+    if simplify:
+        try:
+            simplify = float(simplify)
+        except ValueError:
+            raise AreaFileError('Invalid simplify tolerance')
+        if simplify < 0:
+            raise AreaFileError('Invalid simplify tolerance')
+    
+    return {'dissolve': dissolve, 'simplify': simplify or None}
+
+
+def _read_uploaded_area_file(uploaded_file, **options):
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return read_area_file(uploaded_file.temporary_file_path(), uploaded_file.name, **options)
+    
+    suffix = os.path.splitext(uploaded_file.name)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        for chunk in uploaded_file.chunks():
+            tmp.write(chunk)
+        tmp.flush()
+        return read_area_file(tmp.name, uploaded_file.name, **options)
 
 
 def convert_area_file(request):
-    """Accept a GeoJSON or shapefile ZIP and return a MultiPolygon GeoJSON geometry."""
+    """
+    Accept a GeoJSON or shapefile ZIP and return a MultiPolygon GeoJSON geometry.
+    
+    Uploads larger than CAP_AREA_FILE_ASYNC_SIZE are converted by a worker. The response is then a
+    202 with a status URL, to poll until the geometry is ready. The optional `dissolve` and
+    `simplify` fields merge adjacent polygons, and simplify them with a tolerance in degrees.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
@@ -82,101 +184,36 @@ def convert_area_file(request):
     if not uploaded_file:
         return JsonResponse({'error': 'No file provided'}, status=400)
     
-    filename = uploaded_file.name.lower()
-    
     try:
-        if filename.endswith('.geojson') or filename.endswith('.json'):
-            content = uploaded_file.read().decode('utf-8')
-            data = json.loads(content)
-            geom = _extract_multipolygon_from_geojson(data)
-            return JsonResponse({'geometry': geom})
+        check_area_file(uploaded_file.name, uploaded_file.size)
+        options = _get_area_file_options(request.POST)
         
-        elif filename.endswith('.zip'):
-            import fiona
-            from fiona.transform import transform_geom
-            
-            with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as tmp:
-                for chunk in uploaded_file.chunks():
-                    tmp.write(chunk)
-                tmp_path = tmp.name
-            
-            try:
-                geometries = []
-                with fiona.open(f'zip://{tmp_path}') as src:
-                    src_crs = src.crs
-                    need_reproject = (
-                            src_crs is not None and
-                            src_crs.to_epsg() != 4326
-                    )
-                    
-                    for feature in src:
-                        if feature.geometry is None:
-                            continue
-                        geom = dict(feature.geometry)
-                        if need_reproject:
-                            geom = dict(transform_geom(src_crs, 'EPSG:4326', geom))
-                        if geom['type'] == 'Polygon':
-                            geometries.append(geom['coordinates'])
-                        elif geom['type'] == 'MultiPolygon':
-                            geometries.extend(geom['coordinates'])
-                
-                if not geometries:
-                    return JsonResponse(
-                        {'error': 'No polygon geometries found in the shapefile'},
-                        status=400,
-                    )
-                
-                return JsonResponse({
-                    'geometry': {'type': 'MultiPolygon', 'coordinates': geometries}
-                })
-            finally:
-                os.unlink(tmp_path)
-        
-        else:
-            return JsonResponse(
-                {'error': 'Unsupported file format. Please upload .geojson, .json, or .zip (shapefile)'},
-                status=400,
-            )
-    
+        if uploaded_file.size <= get_area_file_async_size():
+            return JsonResponse({'geometry': _read_uploaded_area_file(uploaded_file, **options)})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
-
-
-def _extract_multipolygon_from_geojson(data):
-    geom_type = data.get('type')
-    
-    if geom_type == 'FeatureCollection':
-        features = data.get('features', [])
-        if not features:
-            raise ValueError('Empty FeatureCollection')
-        all_coords = []
-        for feature in features:
-            geom = feature.get('geometry') or {}
-            if geom.get('type') == 'Polygon':
-                all_coords.append(geom['coordinates'])
-            elif geom.get('type') == 'MultiPolygon':
-                all_coords.extend(geom['coordinates'])
-        if not all_coords:
-            raise ValueError('No Polygon or MultiPolygon geometries found')
-        return {'type': 'MultiPolygon', 'coordinates': all_coords}
     
-    elif geom_type == 'Feature':
-        return _ensure_multipolygon(data.get('geometry') or {})
+    from .tasks import handle_convert_area_file
     
-    elif geom_type in ('Polygon', 'MultiPolygon'):
-        return _ensure_multipolygon(data)
+    token = uuid.uuid4().hex
+    name = save_area_file(uploaded_file, token)
+    set_area_file_status(token, request.user.pk, 'pending', progress=0)
+    handle_convert_area_file.delay(token, name, request.user.pk, **options)
     
-    else:
-        raise ValueError(f'Unsupported GeoJSON type: {geom_type}')
+    return JsonResponse({
+        'status': 'pending',
+        'status_url': reverse('convert_area_file_status', args=[token]),
+    }, status=202)
 
 
-def _ensure_multipolygon(geom):
-    if geom.get('type') == 'Polygon':
-        return {'type': 'MultiPolygon', 'coordinates': [geom['coordinates']]}
-    elif geom.get('type') == 'MultiPolygon':
-        return geom
-    else:
-        raise ValueError(f"Expected Polygon or MultiPolygon geometry, got {geom.get('type')}")
+def convert_area_file_status(request, token):
+    """Status of an area file conversion started by `convert_area_file`, with the geometry once done"""
+    status = get_area_file_status(token)
+    if not status or status.get('user_id') != request.user.pk:
+        return JsonResponse({'error': 'Conversion not found'}, status=404)
+    
+    data = {key: value for key, value in status.items() if key != 'user_id'}
+    return JsonResponse(data)
 
 
 def map_widget_config(request):
@@ -205,19 +242,8 @@ def translate_text(request):
         return JsonResponse({'error': 'Missing required fields'}, status=400)
     
     try:
-        from django_deep_translator.utils import get_translator
-        translator = get_translator()
-    except Exception as e:
+        translated = translate_texts(texts, target_language, source_language)
+    except TranslationServiceError as e:
         return JsonResponse({'error': f'Translation service unavailable: {e}'}, status=503)
     
-    translated = {}
-    for key, text in texts.items():
-        if text and isinstance(text, str) and text.strip():
-            try:
-                translated[key] = translator.translate_string(text, target_language, source_language)
-            except Exception:
-                translated[key] = text
-        else:
-            translated[key] = text
-    
     return JsonResponse({'translated': translated})
@@ -22,7 +22,10 @@ from capcomposer.capeditor.views import (
     load_cap_alert,
     import_cap_alert,
     get_un_boundary_geojson,
+    get_un_boundary_geojson_variant,
+    area_tile,
     convert_area_file,
+    convert_area_file_status,
     translate_text,
 )
 
@@ -48,7 +51,11 @@ def urlconf_capeditor():
         path('import-cap/', load_cap_alert, name='load_cap_alert'),
         path('import-cap/import/', import_cap_alert, name='import_cap_alert'),
         path('cap/un-boundary-geojson', get_un_boundary_geojson, name='un_boundary_geojson'),
+        path('cap/un-boundary/<str:resolution>.<str:content_hash>.geojson', get_un_boundary_geojson_variant,
+             name='un_boundary_geojson_variant'),
+        path('cap/tiles/<int:z>/<int:x>/<int:y>.mvt', area_tile, name='cap_area_tile'),
         path('cap/convert-area-file', convert_area_file, name='convert_area_file'),
+        path('cap/convert-area-file/<str:token>/', convert_area_file_status, name='convert_area_file_status'),
         path('cap/map-widget-config/', map_widget_config, name='map_widget_config'),
         path('cap/translate-text/', translate_text, name='translate_text'),
     ]
@@ -1,7 +1,8 @@
 import os
 
-from channels.routing import ProtocolTypeRouter
+from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
+from django.urls import path, re_path
 
 from capcomposer.config.telemetry.telemetry import setup_telemetry, setup_logging
 
@@ -16,6 +17,15 @@ django_asgi_app = get_asgi_application()
 # logging setup. Otherwise Django will try to destroy and log handlers we added prior.
 setup_logging()
 
+# Imported once django has been setup, as it uses the models
+from capcomposer.cap.consumers import AlertEventStream  # noqa: E402
+
 application = ProtocolTypeRouter(
-    {"http": django_asgi_app, }
+    {
+        "http": URLRouter([
+            # long-lived event streams are served outside django, to not hold a worker thread each
+            path("api/cap/alerts/stream/", AlertEventStream()),
+            re_path(r"", django_asgi_app),
+        ]),
+    }
 )
@@ -271,6 +271,11 @@ REDIS_URL = env.str(
 
 CELERY_BROKER_URL = REDIS_URL
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+# unacknowledged tasks are redelivered after this many seconds. Alert boundary tasks are enqueued
+# within half of it, see cap.expiry.get_boundary_schedule_window
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": env.int("CELERY_BROKER_VISIBILITY_TIMEOUT", default=60 * 60),
+}
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 CELERY_SINGLETON_BACKEND_CLASS = (
@@ -293,6 +298,10 @@ CACHES = {
     },
 }
 
+# Track cached page urls, so that publishing an alert only purges the pages that depend on it.
+# Without the keyring, wagtail-cache can only clear the whole cache backend.
+WAGTAIL_CACHE_KEYRING = True
+
 CAP_COMPOSER_LOG_LEVEL = env.str("CAP_COMPOSER_LOG_LEVEL", "INFO")
 CAP_COMPOSER_DATABASE_LOG_LEVEL = env.str("CAP_COMPOSER_DATABASE_LOG_LEVEL", "ERROR")
 
@@ -354,6 +363,40 @@ else:
 EMAIL_HOST_USER = env.str('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env.str('EMAIL_HOST_PASSWORD', default="")
 
+# Number of private alert emails sent per SMTP connection, and number of connections used concurrently
+CAP_PRIVATE_ALERT_EMAIL_BATCH_SIZE = env.int("CAP_PRIVATE_ALERT_EMAIL_BATCH_SIZE", default=50)
+CAP_PRIVATE_ALERT_EMAIL_WORKERS = env.int("CAP_PRIVATE_ALERT_EMAIL_WORKERS", default=1)
+
+# Number of past alerts kept in the alert history window, besides the active ones
+CAP_ALERT_HISTORY_WINDOW = env.int("CAP_ALERT_HISTORY_WINDOW", default=20)
+
+# Alert event stream: seconds between heartbeats on idle connections, events buffered per client
+# before a slow client is disconnected, and events kept per site for clients to resume from
+CAP_ALERT_STREAM_HEARTBEAT = env.int("CAP_ALERT_STREAM_HEARTBEAT", default=15)
+CAP_ALERT_STREAM_QUEUE_SIZE = env.int("CAP_ALERT_STREAM_QUEUE_SIZE", default=100)
+CAP_ALERT_STREAM_REPLAY_LENGTH = env.int("CAP_ALERT_STREAM_REPLAY_LENGTH", default=1000)
+
+# Minutes between sweeps catching alert expiries whose scheduled refresh did not run
+CAP_ALERT_EXPIRY_SWEEP_INTERVAL = env.int("CAP_ALERT_EXPIRY_SWEEP_INTERVAL", default=5)
+
+# Most vertices of the areas of an alert info in CAP messages, feeds and maps. Detailed areas are
+# simplified to fit, starting at the tolerance in degrees
+CAP_AREA_VERTEX_BUDGET = env.int("CAP_AREA_VERTEX_BUDGET", default=5000)
+CAP_AREA_SIMPLIFY_TOLERANCE = env.float("CAP_AREA_SIMPLIFY_TOLERANCE", default=0.0001)
+
+# Limits of the area files uploaded in the map widget. Files larger than the async size, in bytes,
+# are converted by a worker
+CAP_AREA_FILE_MAX_SIZE = env.int("CAP_AREA_FILE_MAX_SIZE", default=50 * 1024 * 1024)
+CAP_AREA_FILE_MAX_VERTICES = env.int("CAP_AREA_FILE_MAX_VERTICES", default=1000000)
+CAP_AREA_FILE_ASYNC_SIZE = env.int("CAP_AREA_FILE_ASYNC_SIZE", default=2 * 1024 * 1024)
+
+# Days machine translations of alert texts are cached for, and concurrent calls to the translation provider
+CAP_TRANSLATION_CACHE_TIMEOUT = env.int("CAP_TRANSLATION_CACHE_TIMEOUT", default=30) * 24 * 60 * 60
+CAP_TRANSLATION_WORKERS = env.int("CAP_TRANSLATION_WORKERS", default=4)
+
+# Threads serializing and signing alerts for the CAP XML archive export
+CAP_XML_EXPORT_WORKERS = env.int("CAP_XML_EXPORT_WORKERS", default=4)
+
 # A list of people who get error notifications.
 ADMINS = getaddresses([env('DJANGO_ADMINS', default="")])
 
@@ -1,13 +1,15 @@
 from dataclasses import Field
 
-from adminboundarymanager.models import AdminBoundarySettings
+from adminboundarymanager.models import AdminBoundarySettings, Country
 from django.db import models
-from django.utils.functional import cached_property
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import gettext_lazy as _
 from wagtail.admin.panels import FieldPanel
 from wagtail.models import Page, Site
+from wagtail.signals import page_published, page_unpublished, post_page_move
 
-from capcomposer.cap.models import CapAlertPage, CapAlertListPage
+from capcomposer.cap.models import CapAlertListPage
+from .utils import get_site_directory, clear_site_directory
 
 
 class HomePage(Page):
@@ -24,60 +26,18 @@ class HomePage(Page):
     
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request)
-        sites = Site.objects.all()
-        
-        linked_sites = []
-        cap_list_pages = CapAlertListPage.objects.live()
-        
-        for site in sites:
-            for cap_list_page in cap_list_pages:
-                
-                if cap_list_page.get_site() == site:
-                    adm_boundary_setting = AdminBoundarySettings.for_site(site)
-                    country = adm_boundary_setting.countries.first()
-                    
-                    site_info = {
-                        "site": site,
-                        "cap_list_page": cap_list_page
-                    }
-                    
-                    if country:
-                        site_info["country"] = country
-                    
-                    linked_sites.append(site_info)
-        
-        context["linked_sites"] = linked_sites
+        context["linked_sites"] = get_site_directory()
         
         return context
 
 
-@cached_property
-def cap_alerts(self):
-    alerts = CapAlertPage.objects.all().live().filter(status="Actual").order_by('-sent')
-    alert_infos = []
-    
-    for alert in alerts:
-        for alert_info in alert.infos:
-            alert_infos.append(alert_info)
-    
-    alert_infos = sorted(alert_infos, key=lambda x: x.get("sent", {}), reverse=True)
-    
-    return alert_infos
-
-
-@cached_property
-def alerts_by_expiry(self):
-    all_alerts = self.cap_alerts
-    active_alerts = []
-    past_alerts = []
-    
-    for alert in all_alerts:
-        if alert.get("expired"):
-            past_alerts.append(alert)
-        else:
-            active_alerts.append(alert)
-    
-    return {
-        "active_alerts": active_alerts,
-        "past_alerts": past_alerts
-    }
+# rebuild the site directory when list pages, sites or their boundary settings change
+for signal in (page_published, page_unpublished, post_page_move):
+    signal.connect(clear_site_directory, sender=CapAlertListPage)
+post_delete.connect(clear_site_directory, sender=CapAlertListPage)
+post_save.connect(clear_site_directory, sender=Site)
+post_delete.connect(clear_site_directory, sender=Site)
+post_save.connect(clear_site_directory, sender=AdminBoundarySettings)
+# countries are saved after their settings instance
+post_save.connect(clear_site_directory, sender=Country)
+post_delete.connect(clear_site_directory, sender=Country)
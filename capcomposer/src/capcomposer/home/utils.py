@@ -0,0 +1,69 @@
+from adminboundarymanager.models import AdminBoundarySettings
+from wagtail.models import Site
+
+from capcomposer.cap.cache import wagcache
+from capcomposer.cap.models import CapAlertListPage
+
+SITE_DIRECTORY_CACHE_KEY = "capcomposer_site_directory"
+
+
+def build_site_directory():
+    """
+    The live CAP list page and country of every site, for linking to country sites from the home page.
+    
+    Uses a fixed number of queries however many sites are hosted: pages are matched to sites
+    using the site root paths, and boundary settings are loaded for all sites at once.
+    """
+    sites = {site.pk: site for site in Site.objects.all()}
+    
+    boundary_settings = AdminBoundarySettings.objects.filter(site_id__in=sites.keys()).prefetch_related("countries")
+    countries_by_site = {}
+    for boundary_setting in boundary_settings:
+        countries = list(boundary_setting.countries.all())
+        if countries:
+            countries_by_site[boundary_setting.site_id] = countries[0]
+    
+    directory = []
+    
+    for cap_list_page in CapAlertListPage.objects.live():
+        url_parts = cap_list_page.get_url_parts()
+        if not url_parts:
+            continue
+        
+        site = sites.get(url_parts[0])
+        if not site:
+            continue
+        
+        site_info = {
+            "site_id": site.pk,
+            "site_name": site.site_name,
+            "root_url": site.root_url,
+            "cap_list_page_id": cap_list_page.pk,
+            "title": cap_list_page.title,
+        }
+        
+        country = countries_by_site.get(site.pk)
+        if country:
+            site_info["country"] = {
+                "name": str(country.country.name),
+                "code": country.country.code,
+                "flag": country.country.flag,
+            }
+        
+        directory.append(site_info)
+    
+    return directory
+
+
+def get_site_directory():
+    directory = wagcache.get(SITE_DIRECTORY_CACHE_KEY)
+    
+    if directory is None:
+        directory = build_site_directory()
+        wagcache.set(SITE_DIRECTORY_CACHE_KEY, directory, None)
+    
+    return directory
+
+
+def clear_site_directory(**kwargs):
+    wagcache.delete(SITE_DIRECTORY_CACHE_KEY)